@@ -0,0 +1,133 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_resume_text(resume_text):
+    """Collapse whitespace so trivially different extractions share a key
+
+    Case is kept: the model sees the original text, and casing can change its analysis.
+    """
+    return ' '.join(resume_text.split())
+
+
+def analysis_cache_key(resume_text, version):
+    """Content-addressed key for a resume under a given prompt/model version"""
+    digest = hashlib.sha256()
+    digest.update(version.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(normalize_resume_text(resume_text).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """LRU + TTL cache of analysis results with an optional on-disk tier"""
+
+    def __init__(self, max_entries=256, ttl_seconds=86400, disk_dir=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, value = entry
+                if now - created < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                # Expired, drop it and fall through to the disk tier
+                del self._entries[key]
+                self.evictions += 1
+
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, entry[0], entry[1])
+            return entry[1]
+
+    def set(self, key, value):
+        """Store value under key in memory and, if enabled, on disk"""
+        now = time.time()
+        with self._lock:
+            self._store(key, now, value)
+        self._write_disk(key, now, value)
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'disk_enabled': bool(self.disk_dir),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': (self.hits + self.disk_hits) / lookups if lookups else 0.0
+            }
+
+    def _store(self, key, created, value):
+        """Insert into the in-memory tier, evicting least recently used entries"""
+        self._entries[key] = (created, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key, now):
+        """Load an entry from the disk tier, removing it if it has expired"""
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if now - record['created'] >= self.ttl_seconds:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return record['created'], record['value']
+
+    def _write_disk(self, key, created, value):
+        """Atomically write an entry to the disk tier"""
+        if not self.disk_dir:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'created': created, 'value': value}, f)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError as e:
+            logger.warning("Analysis cache disk write error: %s", e)
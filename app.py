@@ -1,33 +1,149 @@
-from flask import Flask, request, jsonify, session, render_template_string
+from flask import Flask, Request, request, jsonify, session, render_template_string, Response, stream_with_context, g
+from flask.json.provider import DefaultJSONProvider
 import os
+import json
 from dotenv import load_dotenv
-import openai
-import PyPDF2
-import docx
 import uuid
 from werkzeug.utils import secure_filename
 import io
+import logging
+import hashlib
+import hmac
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from analysis_cache import AnalysisCache, analysis_cache_key
+from jobs import JobQueue, QueueFull
+from llm_gateway import LLMGateway, parse_route_limits
+from session_store import SessionStore
+from chat_context import build_context_messages, build_summary_messages, turns_to_fold
+from prefetch import Prefetcher
+from singleflight import SingleFlight
+from extraction import extract_text_from_file
+from metrics import registry, CONTENT_TYPE, PHASE_SECONDS, REQUEST_SECONDS, REQUESTS_IN_FLIGHT
+from request_logging import setup_logging, parse_sample_rates, start_request, end_request, submit_with_context
+from profiling import SamplingProfiler
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import RequestEntityTooLarge
 
 # Load environment variables
 load_dotenv()
 
+# JSON logs go through a bounded queue to a background writer, so request threads
+# never wait on stdout. Requests to routes in LOG_SAMPLE_RATES are only logged in
+# full at that rate; their warnings and errors are always kept.
+log_handler = setup_logging(
+    level=os.getenv('LOG_LEVEL', 'INFO'),
+    queue_size=int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+)
+log_sample_rates = parse_sample_rates(os.getenv('LOG_SAMPLE_RATES', '/healthz=0,/readyz=0,/metrics=0'))
+logger = logging.getLogger(__name__)
+
+# Uploads above UPLOAD_SPOOL_THRESHOLD bytes are spooled to a temporary file
+# instead of being held in memory; requests above UPLOAD_MAX_BYTES are refused
+UPLOAD_SPOOL_THRESHOLD = int(os.getenv('UPLOAD_SPOOL_THRESHOLD', str(256 * 1024)))
+
+class SpooledUploadRequest(Request):
+    """Request that spools file uploads to disk past a configurable size"""
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_THRESHOLD, mode='rb+')
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Default JSON provider that records serialization time under the json phase"""
+    def dumps(self, obj, **kwargs):
+        with PHASE_SECONDS.time('json'):
+            return super().dumps(obj, **kwargs)
+
 app = Flask(__name__)
 app.secret_key = os.urandom(24)  # For session management
+app.request_class = SpooledUploadRequest
+app.json = TimedJSONProvider(app)
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('UPLOAD_MAX_BYTES', str(10 * 1024 * 1024)))
 
-# Configure OpenAI client
-try:
-    client = openai.OpenAI(
-        api_key=os.getenv('OPENAI_API_KEY'),
-        timeout=30.0
-    )
-except Exception as e:
-    print(f"OpenAI client initialization error: {e}")
-    # Fallback to older API style if needed
-    openai.api_key = os.getenv('OPENAI_API_KEY')
-    client = None
+# Every LLM call goes through one gateway: shared connection pool, retries with
+# jittered backoff on 429/5xx and caps on concurrent in-flight requests
+llm = LLMGateway(
+    api_key=os.getenv('OPENAI_API_KEY'),
+    base_url=os.getenv('OPENAI_BASE_URL') or None,
+    timeout=float(os.getenv('LLM_TIMEOUT', '30')),
+    max_retries=int(os.getenv('LLM_MAX_RETRIES', '3')),
+    max_connections=int(os.getenv('LLM_MAX_CONNECTIONS', '32')),
+    max_in_flight=int(os.getenv('LLM_MAX_IN_FLIGHT', '16')),
+    route_limits=parse_route_limits(os.getenv('LLM_ROUTE_LIMITS', 'analysis=8,chat=8,chat_summary=2,prefetch=2,job_suggestions=4,cover_letter=4,interview_questions=4')),
+    stream_usage=os.getenv('LLM_STREAM_USAGE', '1') == '1'
+)
+
+# In-memory storage for sessions (replace with database in production).
+# Idle sessions expire and the least recently used are evicted past the byte cap.
+session_data = SessionStore(
+    idle_ttl=int(os.getenv('SESSION_IDLE_TTL', '3600')),
+    max_bytes=int(os.getenv('SESSION_MAX_BYTES', str(256 * 1024 * 1024))),
+    sweep_interval=int(os.getenv('SESSION_SWEEP_INTERVAL', '60'))
+)
+
+# Prompt token budget per route; older chat turns beyond it are folded into a summary
+context_budgets = parse_route_limits(os.getenv('LLM_CONTEXT_BUDGETS', 'chat=6000'))
+
+# Chat summaries are refreshed off the request path
+summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='chat-summary')
+compacting_sessions = set()
+compacting_lock = threading.Lock()
+
+# Shared pool for fanning out the sections of /full-report; the LLM gateway
+# still caps how many of them actually hit the provider at once
+report_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('REPORT_WORKERS', '16')),
+    thread_name_prefix='report'
+)
 
-# In-memory storage for sessions (replace with database in production)
-session_data = {}
+# Optional speculative prefetch of job suggestions once an analysis is stored.
+# Prefetches are skipped while the LLM gateway is busier than PREFETCH_MAX_LOAD
+# of its in-flight cap, so they never crowd out interactive requests.
+PREFETCH_JOB_SUGGESTIONS = os.getenv('PREFETCH_JOB_SUGGESTIONS', '0') == '1'
+PREFETCH_MAX_LOAD = float(os.getenv('PREFETCH_MAX_LOAD', '0.5'))
+prefetcher = Prefetcher(
+    max_workers=int(os.getenv('PREFETCH_WORKERS', '2')),
+    max_pending=int(os.getenv('PREFETCH_MAX_PENDING', '8')),
+    is_busy=lambda: llm.stats()['in_flight'] >= llm.max_in_flight * PREFETCH_MAX_LOAD
+)
+
+# Identical generator requests in flight at the same time (double-clicks, client
+# retries) share one LLM call, keyed by route, session and normalized job role
+generations = SingleFlight()
+
+# Bounded background pool for asynchronous uploads
+upload_jobs = JobQueue(
+    max_workers=int(os.getenv('UPLOAD_JOB_WORKERS', '4')),
+    max_queued=int(os.getenv('UPLOAD_JOB_QUEUE', '32'))
+)
+
+# Opt-in request profiling. A request is profiled when it sends "X-Profile: 1"
+# with a valid X-Admin-Token (always kept), or at random at PROFILE_SAMPLE_RATE
+# (kept only if slower than PROFILE_SLOW_MS). Admin endpoints are off unless
+# ADMIN_TOKEN is set.
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+profiler = SamplingProfiler(
+    interval=float(os.getenv('PROFILE_INTERVAL_MS', '5')) / 1000,
+    keep=int(os.getenv('PROFILE_KEEP', '50')),
+    slow_ms=float(os.getenv('PROFILE_SLOW_MS', '1000')),
+    sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', '0')),
+    directory=os.getenv('PROFILE_DIR') or None
+)
+
+def is_admin():
+    """Whether the request carries the admin token"""
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+# Set once the server starts shutting down so /readyz takes this process out of rotation
+shutting_down = threading.Event()
+
+def begin_shutdown():
+    """Stop reporting ready; requests already in flight are left to finish"""
+    shutting_down.set()
 
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'pdf', 'docx', 'txt'}
@@ -36,45 +152,7 @@ def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def extract_text_from_pdf(file_stream):
-    """Extract text from PDF file"""
-    try:
-        pdf_reader = PyPDF2.PdfReader(file_stream)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text.strip()
-    except Exception as e:
-        return f"Error reading PDF: {str(e)}"
-
-def extract_text_from_docx(file_stream):
-    """Extract text from DOCX file"""
-    try:
-        doc = docx.Document(file_stream)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text.strip()
-    except Exception as e:
-        return f"Error reading DOCX: {str(e)}"
-
-def extract_text_from_file(file):
-    """Extract text from uploaded file based on its type"""
-    filename = file.filename.lower()
-    
-    if filename.endswith('.pdf'):
-        return extract_text_from_pdf(file.stream)
-    elif filename.endswith('.docx'):
-        return extract_text_from_docx(file.stream)
-    elif filename.endswith('.txt'):
-        return file.read().decode('utf-8')
-    else:
-        return "Unsupported file format"
-
-def analyze_resume_with_ai(resume_text):
-    """Comprehensive resume analysis with mandatory features"""
-    try:
-        system_prompt = """You are an expert resume analyst and career coach. You must provide a comprehensive analysis covering these THREE MANDATORY sections:
+ANALYSIS_SYSTEM_PROMPT = """You are an expert resume analyst and career coach. You must provide a comprehensive analysis covering these THREE MANDATORY sections:
 
 ## 1. AI RESUME IMPROVEMENT
 Provide clear, actionable suggestions for:
@@ -100,49 +178,106 @@ Provide strategic career advice:
 
 Format your response with clear headers using ### for each section. Be specific, actionable, and professional."""
 
-        if client:
-            # Use new client
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": system_prompt
-                    },
-                    {
-                        "role": "user", 
-                        "content": f"Please provide a comprehensive analysis of this resume:\n\n{resume_text}"
-                    }
-                ],
-                max_tokens=2000,
-                temperature=0.7
-            )
-            return response.choices[0].message.content
-        else:
-            # Fallback to older API
-            response = openai.ChatCompletion.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": system_prompt
-                    },
-                    {
-                        "role": "user", 
-                        "content": f"Please provide a comprehensive analysis of this resume:\n\n{resume_text}"
-                    }
-                ],
-                max_tokens=2000,
-                temperature=0.7
-            )
-            return response.choices[0].message.content
+# Cache key version: changes whenever the analysis prompt or model changes,
+# so stale analyses are never served after a prompt update
+ANALYSIS_MODEL = "gpt-4o-mini"
+ANALYSIS_MAX_TOKENS = 2000
+ANALYSIS_CACHE_VERSION = hashlib.sha256(
+    f"{ANALYSIS_MODEL}\n{ANALYSIS_SYSTEM_PROMPT}".encode('utf-8')
+).hexdigest()[:16]
+
+# Content-addressed cache so identical resumes skip the LLM
+analysis_cache = AnalysisCache(
+    max_entries=int(os.getenv('ANALYSIS_CACHE_SIZE', '256')),
+    ttl_seconds=int(os.getenv('ANALYSIS_CACHE_TTL', '86400')),
+    disk_dir=os.getenv('ANALYSIS_CACHE_DIR') or None
+)
+
+# Gauges read from the components' own counters when /metrics is scraped
+registry.callback('session_store_sessions', 'Live sessions in the session store',
+                  lambda: session_data.stats()['live_sessions'])
+registry.callback('session_store_bytes', 'Approximate bytes held by the session store',
+                  lambda: session_data.stats()['bytes'])
+registry.callback('analysis_cache_lookups_total', 'Analysis cache lookups by result',
+                  lambda: {(result,): analysis_cache.stats()[key]
+                           for result, key in (('hit', 'hits'), ('disk_hit', 'disk_hits'), ('miss', 'misses'))},
+                  ('result',), kind='counter')
+registry.callback('analysis_cache_hit_ratio', 'Share of analysis cache lookups served from memory or disk',
+                  lambda: analysis_cache.stats()['hit_ratio'])
+registry.callback('llm_in_flight', 'LLM requests holding a gateway slot, by route',
+                  lambda: {(route,): count for route, count in llm.stats()['in_flight_by_route'].items()},
+                  ('route',))
+registry.callback('llm_gateway_events_total', 'LLM gateway retries, failures and rejections',
+                  lambda: {(event,): llm.stats()[event] for event in ('retries', 'failures', 'rejected')},
+                  ('event',), kind='counter')
+registry.callback('generations_total', 'Generator requests that made their own LLM call or shared one in flight',
+                  lambda: {(outcome,): generations.stats()[outcome] for outcome in ('calls', 'shared')},
+                  ('outcome',), kind='counter')
+registry.callback('log_records_dropped_total', 'Log records dropped because the log queue was full',
+                  lambda: log_handler.dropped, kind='counter')
+registry.callback('upload_jobs', 'Asynchronous upload jobs by state',
+                  lambda: {(state,): upload_jobs.stats()[state] for state in ('queued', 'running')},
+                  ('state',))
+
+def build_analysis_messages(resume_text):
+    """Build the chat messages for a resume analysis request"""
+    return [
+        {
+            "role": "system", 
+            "content": ANALYSIS_SYSTEM_PROMPT
+        },
+        {
+            "role": "user", 
+            "content": f"Please provide a comprehensive analysis of this resume:\n\n{resume_text}"
+        }
+    ]
+
+def analyze_resume_with_ai(resume_text):
+    """Comprehensive resume analysis with mandatory features"""
+    try:
+        cache_key = analysis_cache_key(resume_text, ANALYSIS_CACHE_VERSION)
+        cached = analysis_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        analysis = llm.complete(
+            'analysis',
+            build_analysis_messages(resume_text),
+            max_tokens=ANALYSIS_MAX_TOKENS,
+            model=ANALYSIS_MODEL
+        )
+        analysis_cache.set(cache_key, analysis)
+        return analysis
     except Exception as e:
         return f"Error analyzing resume: {str(e)}"
 
-@app.route('/')
-def index():
-    """Main page with upload form and chat interface"""
-    html_template = """
+def stream_resume_analysis(resume_text):
+    """Yield the resume analysis piece by piece as the model generates it"""
+    return llm.stream('analysis', build_analysis_messages(resume_text), max_tokens=ANALYSIS_MAX_TOKENS, model=ANALYSIS_MODEL)
+
+def create_session(session_id, resume_text, analysis):
+    """Store a freshly analyzed resume as a new session"""
+    session_data[session_id] = {
+        'resume_text': resume_text,
+        'analysis': analysis,
+        'chat_history': [],
+        'chat_summary': '',
+        # Generator results, see get_generated()
+        'generated': {}
+    }
+
+def preview_resume_text(resume_text):
+    """Truncated resume text for responses"""
+    return resume_text[:500] + '...' if len(resume_text) > 500 else resume_text
+
+def sse_event(event, data):
+    """Format one Server-Sent Events frame with a JSON payload"""
+    with PHASE_SECONDS.time('json'):
+        payload = json.dumps(data)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+# Main page, shared with the async variant in asgi_app.py
+INDEX_HTML = """
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -673,6 +808,9 @@ def index():
                     <button onclick="showInterviewQuestionsModal()" class="feature-btn" id="interviewBtn">
                         <i class="fas fa-question-circle"></i> Interview Questions
                     </button>
+                    <button onclick="showFullReportModal()" class="feature-btn" id="fullReportBtn">
+                        <i class="fas fa-layer-group"></i> Full Report
+                    </button>
                 </div>
                 
                 <!-- Results containers for optional features -->
@@ -723,10 +861,18 @@ def index():
             </div>
         </div>
 
+        <!-- Modal for Full Report -->
+        <div id="fullReportModal" class="modal" style="display: none;">
+            <div class="modal-content">
+                <span class="close" onclick="closeFullReportModal()">&times;</span>
+                <h3>Generate Full Report</h3>
+                <input type="text" id="fullReportJobRoleInput" placeholder="Target job role for cover letter and questions (optional)" class="modal-input">
+                <button onclick="generateFullReport()" class="btn">Generate Report</button>
+            </div>
+        </div>
+
         <script>
             let sessionId = null;
-            let resumeText = '';
-            let chatHistory = [];
 
             // Handle resume upload and analysis
             document.getElementById('uploadForm').addEventListener('submit', async function(e) {
@@ -749,30 +895,54 @@ def index():
                 document.getElementById('chatContainer').style.display = 'none';
 
                 try {
-                    const response = await fetch('/upload', {
+                    // Browsers without streaming fetch bodies fall back to a polled background job
+                    if (!window.ReadableStream) {
+                        await uploadWithJob(formData);
+                        return;
+                    }
+
+                    const response = await fetch('/upload?stream=1', {
                         method: 'POST',
                         body: formData
                     });
 
-                    const result = await response.json();
-                    
-                    if (result.success) {
-                        sessionId = result.session_id;
-                        resumeText = result.resume_text;
-                        
-                        // Display analysis results with better formatting
-                        document.getElementById('analysisContent').innerHTML = formatAnalysisText(result.analysis);
-                        document.getElementById('analysisResult').style.display = 'block';
-                        document.getElementById('chatContainer').style.display = 'block';
-                        document.getElementById('optionalFeatures').style.display = 'block';
-                        
-                        // Clear previous chat and optional features
-                        chatHistory = [];
-                        document.getElementById('chatHistory').innerHTML = '';
-                        hideAllFeatureResults();
-                    } else {
+                    // Extraction errors come back up front as plain JSON
+                    if (!(response.headers.get('Content-Type') || '').startsWith('text/event-stream')) {
+                        const result = await response.json();
                         alert('Error: ' + result.error);
+                        return;
                     }
+
+                    let analysisText = '';
+                    let renderPending = false;
+                    const analysisContent = document.getElementById('analysisContent');
+                    const renderAnalysis = function() {
+                        renderPending = false;
+                        analysisContent.innerHTML = formatAnalysisText(analysisText);
+                    };
+
+                    await readEventStream(response, function(event, data) {
+                        if (event === 'session') {
+                            sessionId = data.session_id;
+                            
+                            // Show the analysis panel as soon as the first bytes arrive
+                            document.getElementById('loading').style.display = 'none';
+                            analysisContent.innerHTML = '';
+                            document.getElementById('analysisResult').style.display = 'block';
+                        } else if (event === 'token') {
+                            analysisText += data.text;
+                            if (!renderPending) {
+                                renderPending = true;
+                                requestAnimationFrame(renderAnalysis);
+                            }
+                        } else if (event === 'done') {
+                            renderAnalysis();
+                            showSessionPanels();
+                        } else if (event === 'error') {
+                            sessionId = null;
+                            alert('Error: ' + data.error);
+                        }
+                    });
                 } catch (error) {
                     alert('Upload failed: ' + error.message);
                 } finally {
@@ -780,6 +950,77 @@ def index():
                 }
             });
 
+            // Upload as a background job and poll /jobs/<id> until it finishes
+            async function uploadWithJob(formData) {
+                formData.append('async', '1');
+                const response = await fetch('/upload', {
+                    method: 'POST',
+                    body: formData
+                });
+                let job = await response.json();
+                if (!job.success) {
+                    alert('Error: ' + job.error);
+                    return;
+                }
+                
+                const jobId = job.job_id;
+                while (job.status === 'queued' || job.status === 'running') {
+                    await new Promise(resolve => setTimeout(resolve, 1000));
+                    job = await (await fetch('/jobs/' + jobId)).json();
+                    if (!job.success) {
+                        alert('Error: ' + job.error);
+                        return;
+                    }
+                }
+                
+                const result = job.result;
+                if (job.status === 'done' && result.success) {
+                    sessionId = result.session_id;
+                    
+                    document.getElementById('analysisContent').innerHTML = formatAnalysisText(result.analysis);
+                    document.getElementById('analysisResult').style.display = 'block';
+                    showSessionPanels();
+                } else {
+                    alert('Error: ' + (result ? result.error : job.error));
+                }
+            }
+
+            function showSessionPanels() {
+                document.getElementById('chatContainer').style.display = 'block';
+                document.getElementById('optionalFeatures').style.display = 'block';
+                
+                // Clear previous chat and optional features
+                document.getElementById('chatHistory').innerHTML = '';
+                hideAllFeatureResults();
+            }
+
+            // Read a Server-Sent Events response and call onEvent for each frame
+            async function readEventStream(response, onEvent) {
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+                
+                while (true) {
+                    const { done, value } = await reader.read();
+                    if (done) break;
+                    buffer += decoder.decode(value, { stream: true });
+                    
+                    let boundary;
+                    while ((boundary = buffer.indexOf('\\n\\n')) !== -1) {
+                        const frame = buffer.slice(0, boundary);
+                        buffer = buffer.slice(boundary + 2);
+                        
+                        let event = 'message';
+                        let data = '';
+                        frame.split('\\n').forEach(function(line) {
+                            if (line.startsWith('event: ')) event = line.slice(7);
+                            else if (line.startsWith('data: ')) data += line.slice(6);
+                        });
+                        onEvent(event, data ? JSON.parse(data) : {});
+                    }
+                }
+            }
+
             // Handle chat input
             document.getElementById('chatInput').addEventListener('keypress', function(e) {
                 if (e.key === 'Enter') {
@@ -795,8 +1036,7 @@ def index():
                     return;
                 }
 
-                // Add user message to chat history
-                chatHistory.push({type: 'user', message: userMessage});
+                // Chat history is kept on the server, only show the message here
                 displayMessage(userMessage, 'user');
                 
                 // Clear input
@@ -818,25 +1058,35 @@ def index():
                         },
                         body: JSON.stringify({
                             session_id: sessionId,
-                            resume_text: resumeText,
-                            chat_history: chatHistory,
-                            user_message: userMessage
+                            user_message: userMessage,
+                            stream: true
                         })
                     });
 
-                    const result = await response.json();
-                    
-                    // Remove typing indicator
-                    document.getElementById('typing-indicator').remove();
-                    
-                    if (result.success) {
-                        chatHistory = result.updated_chat_history;
-                        displayMessage(result.ai_reply, 'ai');
-                    } else {
+                    if (!(response.headers.get('Content-Type') || '').startsWith('text/event-stream')) {
+                        await response.json();
+                        typingDiv.remove();
                         displayMessage('Sorry, there was an error processing your message.', 'ai');
+                        return;
                     }
+
+                    // Replace the typing indicator with the reply as it streams in
+                    let replyText = '';
+                    await readEventStream(response, function(event, data) {
+                        if (event === 'token') {
+                            replyText += data.text;
+                            typingDiv.innerHTML = formatChatText(replyText);
+                            scrollToBottom();
+                        } else if (event === 'done') {
+                            typingDiv.removeAttribute('id');
+                            typingDiv.innerHTML = formatChatText(data.ai_reply);
+                        } else if (event === 'error') {
+                            typingDiv.remove();
+                            displayMessage('Sorry, there was an error processing your message.', 'ai');
+                        }
+                    });
                 } catch (error) {
-                    document.getElementById('typing-indicator').remove();
+                    typingDiv.remove();
                     displayMessage('Sorry, there was a connection error.', 'ai');
                 }
             }
@@ -1022,6 +1272,69 @@ def index():
                 }
             }
 
+            function showFullReportModal() {
+                document.getElementById('fullReportModal').style.display = 'block';
+            }
+
+            function closeFullReportModal() {
+                document.getElementById('fullReportModal').style.display = 'none';
+                document.getElementById('fullReportJobRoleInput').value = '';
+            }
+
+            // Generate every optional section at once; each one is shown as soon as it is ready
+            async function generateFullReport() {
+                if (!sessionId) return;
+                const jobRole = document.getElementById('fullReportJobRoleInput').value.trim();
+                closeFullReportModal();
+                
+                const btn = document.getElementById('fullReportBtn');
+                btn.disabled = true;
+                btn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Generating...';
+                
+                const targets = {
+                    job_suggestions: ['jobSuggestionsContent', 'jobSuggestionsResult'],
+                    cover_letter: ['coverLetterContent', 'coverLetterResult'],
+                    interview_questions: ['interviewQuestionsContent', 'interviewQuestionsResult']
+                };
+                
+                try {
+                    const response = await fetch('/full-report', {
+                        method: 'POST',
+                        headers: {
+                            'Content-Type': 'application/json',
+                        },
+                        body: JSON.stringify({
+                            session_id: sessionId,
+                            job_role: jobRole
+                        })
+                    });
+                    
+                    if (!(response.headers.get('Content-Type') || '').startsWith('text/event-stream')) {
+                        const result = await response.json();
+                        alert('Error: ' + result.error);
+                        return;
+                    }
+                    
+                    const failed = [];
+                    await readEventStream(response, function(event, data) {
+                        if (event === 'section' && targets[data.section]) {
+                            document.getElementById(targets[data.section][0]).innerHTML = formatAnalysisText(data.content);
+                            document.getElementById(targets[data.section][1]).style.display = 'block';
+                        } else if (event === 'section_error') {
+                            failed.push(data.section + ': ' + data.error);
+                        }
+                    });
+                    if (failed.length) {
+                        alert('Some sections could not be generated:\\n' + failed.join('\\n'));
+                    }
+                } catch (error) {
+                    alert('Error: ' + error.message);
+                } finally {
+                    btn.disabled = false;
+                    btn.innerHTML = '<i class="fas fa-layer-group"></i> Full Report';
+                }
+            }
+
             // Close modals when clicking outside
             window.onclick = function(event) {
                 const coverLetterModal = document.getElementById('coverLetterModal');
@@ -1033,26 +1346,77 @@ def index():
                 if (event.target == interviewModal) {
                     closeInterviewModal();
                 }
+                if (event.target == document.getElementById('fullReportModal')) {
+                    closeFullReportModal();
+                }
             }
         </script>
     </body>
     </html>
     """
-    return render_template_string(html_template)
+
+@app.before_request
+def start_request_tracking():
+    """Assign the request ID and count the request as in flight under its route pattern"""
+    g.metrics_route = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.metrics_started = time.perf_counter()
+    g.request_id = start_request(g.metrics_route, request.headers.get('X-Request-ID'), log_sample_rates)
+    REQUESTS_IN_FLIGHT.inc(1, g.metrics_route)
+    
+    g.profile_forced = request.headers.get('X-Profile') == '1' and is_admin()
+    if g.profile_forced or (profiler.sample_rate and random.random() < profiler.sample_rate):
+        g.profile = profiler.start(route=g.metrics_route, method=request.method, request_id=g.request_id)
+
+@app.after_request
+def finish_request_tracking(response):
+    """Record latency and the access log once the response body has been sent, so streams count in full"""
+    route = g.pop('metrics_route', None)
+    if route is None:
+        return response
+    response.headers['X-Request-ID'] = g.request_id
+    started = g.pop('metrics_started')
+    method = request.method
+    profile = g.pop('profile', None)
+    forced = g.pop('profile_forced', False)
+    if profile is not None and forced:
+        response.headers['X-Profile-ID'] = profile.id
+    def finished():
+        seconds = time.perf_counter() - started
+        REQUEST_SECONDS.observe(seconds, route, method, str(response.status_code))
+        REQUESTS_IN_FLIGHT.dec(1, route)
+        if profile is not None:
+            profiler.stop(profile, keep=forced, status=response.status_code)
+        logger.info('request', extra={
+            'method': method,
+            'route': route,
+            'status': response.status_code,
+            'duration_ms': round(seconds * 1000, 1)
+        })
+        end_request()
+    response.call_on_close(finished)
+    return response
+
+@app.route('/')
+def index():
+    """Main page with upload form and chat interface"""
+    return render_template_string(INDEX_HTML)
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    """Reject uploads over MAX_CONTENT_LENGTH with the usual JSON error shape"""
+    limit_mb = app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+    return jsonify({'success': False, 'error': f'File too large (limit is {limit_mb} MB)'}), 413
 
 @app.route('/upload', methods=['POST'])
 def upload_resume():
     """Handle resume upload and analysis"""
     try:
-        print("Upload route called")  # Debug
-        
         # Check if file was uploaded
         if 'file' not in request.files:
-            print("No file in request")  # Debug
             return jsonify({'success': False, 'error': 'No file uploaded'})
         
         file = request.files['file']
-        print(f"File received: {file.filename}")  # Debug
+        logger.info('upload received', extra={'upload_filename': file.filename})
         
         if file.filename == '':
             return jsonify({'success': False, 'error': 'No file selected'})
@@ -1060,162 +1424,493 @@ def upload_resume():
         if not allowed_file(file.filename):
             return jsonify({'success': False, 'error': 'File type not allowed'})
         
-        # Extract text from file
-        print("Extracting text from file...")  # Debug
+        # Async mode: hand the file to the background pool and return a job id
+        if request.args.get('async') or request.form.get('async'):
+            # The request's files are closed once we return, so keep a (spooled) copy
+            spooled = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_THRESHOLD, mode='rb+')
+            shutil.copyfileobj(file.stream, spooled)
+            spooled.seek(0)
+            upload = FileStorage(
+                stream=spooled,
+                filename=file.filename,
+                content_type=file.content_type
+            )
+            try:
+                job_id = upload_jobs.submit(run_upload_job, upload)
+            except QueueFull:
+                return jsonify({'success': False, 'error': 'Server is busy, please try again shortly'}), 503
+            logger.info('upload queued', extra={'job_id': job_id})
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'status': 'queued',
+                'queue': upload_jobs.stats()
+            }), 202
+        
+        # Extract text from file (logged by the extraction module)
         resume_text = extract_text_from_file(file)
-        print(f"Extracted text length: {len(resume_text) if resume_text else 0}")  # Debug
         
         if not resume_text or resume_text.startswith('Error'):
-            print(f"Text extraction error: {resume_text}")  # Debug
             return jsonify({'success': False, 'error': resume_text})
         
         # Generate session ID
         session_id = str(uuid.uuid4())
-        print(f"Generated session ID: {session_id}")  # Debug
+        logger.info('session started', extra={'session_id': session_id})
+        
+        # Streaming mode: extraction errors were already reported above as JSON,
+        # from here on the analysis is sent as Server-Sent Events
+        if request.args.get('stream') or request.form.get('stream'):
+            return Response(
+                stream_with_context(stream_upload_analysis(session_id, resume_text)),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
         
         # Analyze resume with AI
-        print("Starting AI analysis...")  # Debug
         analysis = analyze_resume_with_ai(resume_text)
-        print(f"AI analysis completed. Length: {len(analysis) if analysis else 0}")  # Debug
         
         if analysis.startswith('Error'):
-            print(f"AI analysis error: {analysis}")  # Debug
+            logger.warning('analysis failed', extra={'session_id': session_id, 'error': analysis})
             return jsonify({'success': False, 'error': analysis})
         
         # Store session data
-        session_data[session_id] = {
-            'resume_text': resume_text,
-            'analysis': analysis,
-            'chat_history': []
-        }
+        create_session(session_id, resume_text, analysis)
+        prefetch_job_suggestions(session_id, resume_text)
         
-        print("Returning success response")  # Debug
         return jsonify({
             'success': True,
             'session_id': session_id,
-            'resume_text': resume_text[:500] + '...' if len(resume_text) > 500 else resume_text,  # Truncate for response
+            'resume_text': preview_resume_text(resume_text),  # Truncate for response
             'analysis': analysis
         })
         
+    except RequestEntityTooLarge as e:
+        return upload_too_large(e)
     except Exception as e:
-        print(f"Upload route exception: {str(e)}")  # Debug
+        logger.exception('upload failed')
         return jsonify({'success': False, 'error': str(e)})
 
+def run_upload_job(file):
+    """Extract and analyze an upload on the background pool"""
+    try:
+        resume_text = extract_text_from_file(file)
+    finally:
+        # Releases the spooled temporary file
+        file.close()
+    if not resume_text or resume_text.startswith('Error'):
+        return {'success': False, 'error': resume_text}
+    
+    analysis = analyze_resume_with_ai(resume_text)
+    if analysis.startswith('Error'):
+        return {'success': False, 'error': analysis}
+    
+    session_id = str(uuid.uuid4())
+    create_session(session_id, resume_text, analysis)
+    prefetch_job_suggestions(session_id, resume_text)
+    return {
+        'success': True,
+        'session_id': session_id,
+        'resume_text': preview_resume_text(resume_text),
+        'analysis': analysis
+    }
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Report the status of an asynchronous upload job, with its result when finished"""
+    job = upload_jobs.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'})
+    
+    response = {
+        'success': True,
+        'job_id': job_id,
+        'status': job['status'],
+        'queue': upload_jobs.stats()
+    }
+    if job['status'] == 'done':
+        response['result'] = job['result']
+    elif job['status'] == 'failed':
+        response['error'] = job['error']
+    return jsonify(response)
+
+def stream_upload_analysis(session_id, resume_text):
+    """Stream analysis tokens for an upload and store the session once complete"""
+    yield sse_event('session', {
+        'session_id': session_id,
+        'resume_text': preview_resume_text(resume_text)
+    })
+    
+    cache_key = analysis_cache_key(resume_text, ANALYSIS_CACHE_VERSION)
+    analysis = analysis_cache.get(cache_key)
+    if analysis is not None:
+        # Cache hit, the whole analysis goes out as a single token
+        yield sse_event('token', {'text': analysis})
+    else:
+        parts = []
+        try:
+            for text in stream_resume_analysis(resume_text):
+                parts.append(text)
+                yield sse_event('token', {'text': text})
+        except Exception as e:
+            logger.exception('analysis stream failed', extra={'session_id': session_id})
+            yield sse_event('error', {'error': f"Error analyzing resume: {str(e)}"})
+            return
+        analysis = ''.join(parts)
+        analysis_cache.set(cache_key, analysis)
+    
+    # Store session data only after the full analysis has arrived
+    create_session(session_id, resume_text, analysis)
+    prefetch_job_suggestions(session_id, resume_text)
+    yield sse_event('done', {'session_id': session_id})
+
+CHAT_SYSTEM_PROMPT = "You are a professional resume coach. Give concise, actionable advice tailored to the provided resume. Always reference the resume content and suggest improvements with examples."
+
+def build_chat_base_messages(resume_text):
+    """System prompt and resume, sent verbatim on every chat turn"""
+    return [
+        {
+            "role": "system",
+            "content": CHAT_SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": f"Here is the resume I'm working on:\n\n{resume_text}\n\nPlease keep this context in mind for our conversation."
+        }
+    ]
+
+def build_chat_messages(session_info, user_message):
+    """Build the chat messages for the resume coach within the route's token budget"""
+    return build_context_messages(
+        build_chat_base_messages(session_info['resume_text']),
+        session_info.get('chat_summary', ''),
+        session_info['chat_history'],
+        user_message,
+        context_budgets.get('chat', 6000)
+    )
+
+def record_chat_turn(session_id, user_message, ai_reply):
+    """Append a finished exchange to the session's chat history"""
+    # The session may have gone away while the reply was being generated
+    recorded = session_data.modify(session_id, lambda data: {
+        'chat_history': data['chat_history'] + [
+            {'type': 'user', 'message': user_message},
+            {'type': 'ai', 'message': ai_reply}
+        ]
+    })
+    if recorded:
+        schedule_chat_compaction(session_id)
+
+def schedule_chat_compaction(session_id):
+    """Fold old turns into the summary in the background, at most once at a time per session"""
+    with compacting_lock:
+        if session_id in compacting_sessions:
+            return
+        compacting_sessions.add(session_id)
+    submit_with_context(summary_executor, compact_chat_history, session_id)
+
+def compact_chat_history(session_id):
+    """Fold the oldest chat turns into the running summary once history outgrows the budget"""
+    try:
+        session_info = session_data.get(session_id)
+        if session_info is None:
+            return
+        
+        chat_history = list(session_info['chat_history'])
+        folded = turns_to_fold(
+            build_chat_base_messages(session_info['resume_text']),
+            chat_history,
+            context_budgets.get('chat', 6000)
+        )
+        if not folded:
+            return
+        
+        summary = llm.complete(
+            'chat_summary',
+            build_summary_messages(session_info.get('chat_summary', ''), chat_history[:folded]),
+            max_tokens=400,
+            temperature=0.3
+        )
+        # Turns are only ever appended, so the folded ones are still at the front
+        session_data.modify(session_id, lambda data: {
+            'chat_summary': summary,
+            'chat_history': data['chat_history'][folded:]
+        })
+    except Exception:
+        logger.exception('chat summary failed', extra={'session_id': session_id})
+    finally:
+        with compacting_lock:
+            compacting_sessions.discard(session_id)
+
+def stream_chat_reply(session_id, user_message, messages):
+    """Stream a coach reply and commit it to the session only once complete"""
+    parts = []
+    try:
+        for text in llm.stream('chat', messages, max_tokens=800):
+            parts.append(text)
+            yield sse_event('token', {'text': text})
+    except Exception as e:
+        yield sse_event('error', {'error': str(e)})
+        return
+    
+    ai_reply = ''.join(parts)
+    record_chat_turn(session_id, user_message, ai_reply)
+    yield sse_event('done', {'ai_reply': ai_reply})
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Report cache, session store, upload queue, LLM gateway and prefetch counters"""
+    return jsonify({
+        'success': True,
+        'analysis_cache': analysis_cache.stats(),
+        'sessions': session_data.stats(),
+        'upload_jobs': upload_jobs.stats(),
+        'llm': llm.stats(),
+        'prefetch': prefetcher.stats(),
+        'generations': generations.stats()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition of latency histograms, token counts and gauges"""
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
+@app.route('/admin/profiles', methods=['GET'])
+def list_profiles():
+    """Recent kept profiles, newest first, with the profiler settings"""
+    if not is_admin():
+        return jsonify({'success': False, 'error': 'Forbidden'}), 403
+    return jsonify({'success': True, 'settings': profiler.settings(), 'profiles': profiler.recent()})
+
+@app.route('/admin/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """One profile as collapsed stacks, ready for flamegraph.pl or speedscope"""
+    if not is_admin():
+        return jsonify({'success': False, 'error': 'Forbidden'}), 403
+    profile = profiler.get(profile_id)
+    if profile is None:
+        return jsonify({'success': False, 'error': 'Profile not found'}), 404
+    return Response(profile.collapsed(), mimetype='text/plain')
+
+@app.route('/admin/profiling', methods=['POST'])
+def configure_profiling():
+    """Change the sampled fraction of requests and the slow threshold without a restart"""
+    if not is_admin():
+        return jsonify({'success': False, 'error': 'Forbidden'}), 403
+    data = request.json or {}
+    try:
+        if 'sample_rate' in data:
+            profiler.sample_rate = min(max(float(data['sample_rate']), 0.0), 1.0)
+        if 'slow_ms' in data:
+            profiler.slow_ms = float(data['slow_ms'])
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'sample_rate and slow_ms must be numbers'}), 400
+    return jsonify({'success': True, 'settings': profiler.settings()})
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness check: the process is up and serving requests"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness check: not shutting down and able to take new uploads"""
+    queue = upload_jobs.stats()
+    checks = {
+        'accepting_requests': not shutting_down.is_set(),
+        'upload_queue': queue['queued'] < queue['max_queued']
+    }
+    ready = all(checks.values())
+    return jsonify({'status': 'ready' if ready else 'not ready', 'checks': checks}), 200 if ready else 503
+
 @app.route('/chat', methods=['POST'])
 def chat():
     """Handle chat messages with AI resume coach"""
     try:
         data = request.json
         session_id = data.get('session_id')
-        resume_text = data.get('resume_text', '')
-        chat_history = data.get('chat_history', [])
         user_message = data.get('user_message', '')
         
         if not session_id or not user_message:
             return jsonify({'success': False, 'error': 'Missing required data'})
         
         # Check if session exists
-        if session_id not in session_data:
+        session_info = session_data.get(session_id)
+        if not session_info:
             return jsonify({'success': False, 'error': 'Session not found'})
         
-        # Prepare messages for OpenAI
-        messages = [
-            {
-                "role": "system",
-                "content": "You are a professional resume coach. Give concise, actionable advice tailored to the provided resume. Always reference the resume content and suggest improvements with examples."
-            },
-            {
-                "role": "user",
-                "content": f"Here is the resume I'm working on:\n\n{resume_text}\n\nPlease keep this context in mind for our conversation."
-            }
-        ]
-        
-        # Add chat history to messages
-        for chat_msg in chat_history:
-            if chat_msg['type'] == 'user':
-                messages.append({"role": "user", "content": chat_msg['message']})
-            elif chat_msg['type'] == 'ai':
-                messages.append({"role": "assistant", "content": chat_msg['message']})
+        # Context comes from the server-side session, not from the client
+        messages = build_chat_messages(session_info, user_message)
         
-        # Add current user message
-        messages.append({"role": "user", "content": user_message})
-        
-        # Get AI response
-        if client:
-            # Use new client
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                max_tokens=800,
-                temperature=0.7
-            )
-        else:
-            # Fallback to older API
-            response = openai.ChatCompletion.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                max_tokens=800,
-                temperature=0.7
+        # Streaming mode: push tokens as they arrive, commit history at the end
+        if data.get('stream'):
+            return Response(
+                stream_with_context(stream_chat_reply(session_id, user_message, messages)),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
             )
         
-        ai_reply = response.choices[0].message.content
-        
-        # Update chat history
-        updated_chat_history = chat_history + [
-            {'type': 'user', 'message': user_message},
-            {'type': 'ai', 'message': ai_reply}
-        ]
+        # Get AI response
+        ai_reply = llm.complete('chat', messages, max_tokens=800)
         
         # Update session data
-        session_data[session_id]['chat_history'] = updated_chat_history
+        record_chat_turn(session_id, user_message, ai_reply)
         
         return jsonify({
             'success': True,
-            'ai_reply': ai_reply,
-            'updated_chat_history': updated_chat_history
+            'ai_reply': ai_reply
         })
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+JOB_SUGGESTIONS_PROMPT = """Based on this resume, suggest 3-5 specific job titles that would be most suitable for this candidate. Consider their skills, experience, and background. Format as a numbered list with brief explanations for each suggestion."""
+
+COVER_LETTER_PROMPT = """Create a professional cover letter for the job role: "{job_role}". Base it on the provided resume content. The cover letter should:
+- Be personalized and specific to the role
+- Highlight relevant experience and skills
+- Be professional yet engaging
+- Include proper structure (greeting, body paragraphs, closing)
+- Be approximately 250-300 words"""
+
+INTERVIEW_QUESTIONS_PROMPT = """Generate 8-12 potential interview questions for the job role: "{job_role}" based on this resume. Include:
+- 3-4 general questions about experience and background
+- 3-4 technical/skill-based questions relevant to the role
+- 2-3 behavioral questions
+- 1-2 questions about specific projects or achievements mentioned in the resume
+
+Format as a numbered list with clear, realistic interview questions."""
+
+COVER_LETTER_MAX_TOKENS = 1000
+INTERVIEW_QUESTIONS_MAX_TOKENS = 1200
+
+def build_resume_prompt_messages(prompt, resume_text):
+    """System prompt plus the resume, as used by the optional generators"""
+    return [
+        {"role": "system", "content": prompt},
+        {"role": "user", "content": f"Resume content:\n\n{resume_text}"}
+    ]
+
+def generate_job_suggestions_text(resume_text, route='job_suggestions'):
+    """Suggest job titles that fit the resume"""
+    return llm.complete(
+        route,
+        build_resume_prompt_messages(JOB_SUGGESTIONS_PROMPT, resume_text),
+        max_tokens=800
+    )
+
+def normalize_job_role(job_role):
+    """Case- and whitespace-insensitive form of a job role, for comparing requests"""
+    return ' '.join((job_role or '').split()).casefold()
+
+def build_cover_letter_messages(resume_text, job_role):
+    return build_resume_prompt_messages(COVER_LETTER_PROMPT.format(job_role=job_role), resume_text)
+
+def build_interview_questions_messages(resume_text, job_role):
+    return build_resume_prompt_messages(INTERVIEW_QUESTIONS_PROMPT.format(job_role=job_role), resume_text)
+
+def generate_cover_letter_text(resume_text, job_role):
+    """Write a cover letter for job_role based on the resume"""
+    return llm.complete(
+        'cover_letter',
+        build_cover_letter_messages(resume_text, job_role),
+        max_tokens=COVER_LETTER_MAX_TOKENS
+    )
+
+def generate_interview_questions_text(resume_text, job_role):
+    """List likely interview questions for job_role based on the resume"""
+    return llm.complete(
+        'interview_questions',
+        build_interview_questions_messages(resume_text, job_role),
+        max_tokens=INTERVIEW_QUESTIONS_MAX_TOKENS
+    )
+
+def prefetch_job_suggestions(session_id, resume_text):
+    """Start generating job suggestions before the user asks, if the policy allows"""
+    if PREFETCH_JOB_SUGGESTIONS:
+        prefetcher.submit(session_id, run_job_suggestions_prefetch, session_id, resume_text)
+
+def run_job_suggestions_prefetch(session_id, resume_text):
+    """Background task: generate job suggestions and keep them in the session"""
+    suggestions = generate_job_suggestions_text(resume_text, route='prefetch')
+    if not prefetcher.is_cancelled(session_id):
+        store_generated(session_id, resume_text, 'job_suggestions', '', suggestions)
+    return suggestions
+
+def resume_fingerprint(resume_text):
+    return hashlib.sha256(resume_text.encode('utf-8')).hexdigest()[:16]
+
+def get_generated(session_info, route, job_role=''):
+    """Memoized generator result for the session's current resume, or None
+
+    Entries remember which resume they were generated from, so they stop
+    matching as soon as the session's resume is replaced.
+    """
+    entry = session_info.get('generated', {}).get(f"{route}:{normalize_job_role(job_role)}")
+    if entry and entry['resume'] == resume_fingerprint(session_info['resume_text']):
+        return entry['text']
+    return None
+
+def store_generated(session_id, resume_text, route, job_role, text):
+    """Memoize a generator result in the session, unless its resume changed meanwhile"""
+    fingerprint = resume_fingerprint(resume_text)
+    def change(data):
+        if resume_fingerprint(data['resume_text']) != fingerprint:
+            return {}
+        # Stale entries from an earlier resume are dropped on the way
+        generated = {
+            key: entry for key, entry in data.get('generated', {}).items()
+            if entry['resume'] == fingerprint
+        }
+        generated[f"{route}:{normalize_job_role(job_role)}"] = {'resume': fingerprint, 'text': text}
+        return {'generated': generated}
+    session_data.modify(session_id, change)
+
+def generate_for_session(session_id, resume_text, route, job_role, generate, *args):
+    """Run generate(*args) and memoize the result in the session"""
+    text = generate(*args)
+    store_generated(session_id, resume_text, route, job_role, text)
+    return text
+
+@app.route('/prefetch/cancel', methods=['POST'])
+def cancel_prefetch():
+    """Cancel a pending speculative prefetch for a session"""
+    data = request.json or {}
+    session_id = data.get('session_id')
+    if not session_id:
+        return jsonify({'success': False, 'error': 'Missing required data'})
+    return jsonify({'success': True, 'cancelled': prefetcher.cancel(session_id)})
+
 @app.route('/job-suggestions', methods=['POST'])
 def get_job_suggestions():
     """Generate job role suggestions based on resume"""
     try:
         data = request.json
         session_id = data.get('session_id')
+        regenerate = bool(data.get('regenerate'))
         
-        if not session_id or session_id not in session_data:
-            return jsonify({'success': False, 'error': 'Session not found'})
+        # A prefetch still in flight is joined rather than duplicated, or
+        # discarded when asked to regenerate
+        if session_id and regenerate:
+            prefetcher.cancel(session_id)
+        elif session_id:
+            prefetcher.wait(session_id, timeout=llm.queue_timeout)
         
-        resume_text = session_data[session_id]['resume_text']
-        
-        prompt = """Based on this resume, suggest 3-5 specific job titles that would be most suitable for this candidate. Consider their skills, experience, and background. Format as a numbered list with brief explanations for each suggestion."""
+        session_info = session_data.get(session_id) if session_id else None
+        if not session_info:
+            return jsonify({'success': False, 'error': 'Session not found'})
         
-        if client:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": f"Resume content:\n\n{resume_text}"}
-                ],
-                max_tokens=800,
-                temperature=0.7
+        # Answered from the session when an earlier request or a prefetch produced them
+        resume_text = session_info['resume_text']
+        suggestions = None if regenerate else get_generated(session_info, 'job_suggestions')
+        cached = suggestions is not None
+        if not cached:
+            suggestions = generations.do(
+                ('job_suggestions', session_id, ''),
+                generate_for_session, session_id, resume_text, 'job_suggestions', '',
+                generate_job_suggestions_text, resume_text
             )
-            suggestions = response.choices[0].message.content
-        else:
-            response = openai.ChatCompletion.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": f"Resume content:\n\n{resume_text}"}
-                ],
-                max_tokens=800,
-                temperature=0.7
-            )
-            suggestions = response.choices[0].message.content
         
-        return jsonify({'success': True, 'suggestions': suggestions})
+        return jsonify({'success': True, 'suggestions': suggestions, 'cached': cached})
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -1228,42 +1923,21 @@ def generate_cover_letter():
         session_id = data.get('session_id')
         job_role = data.get('job_role', '')
         
-        if not session_id or session_id not in session_data:
+        session_info = session_data.get(session_id) if session_id else None
+        if not session_info:
             return jsonify({'success': False, 'error': 'Session not found'})
         
-        resume_text = session_data[session_id]['resume_text']
-        
-        prompt = f"""Create a professional cover letter for the job role: "{job_role}". Base it on the provided resume content. The cover letter should:
-- Be personalized and specific to the role
-- Highlight relevant experience and skills
-- Be professional yet engaging
-- Include proper structure (greeting, body paragraphs, closing)
-- Be approximately 250-300 words"""
-        
-        if client:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": f"Resume content:\n\n{resume_text}"}
-                ],
-                max_tokens=1000,
-                temperature=0.7
-            )
-            cover_letter = response.choices[0].message.content
-        else:
-            response = openai.ChatCompletion.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": f"Resume content:\n\n{resume_text}"}
-                ],
-                max_tokens=1000,
-                temperature=0.7
+        resume_text = session_info['resume_text']
+        cover_letter = None if data.get('regenerate') else get_generated(session_info, 'cover_letter', job_role)
+        cached = cover_letter is not None
+        if not cached:
+            cover_letter = generations.do(
+                ('cover_letter', session_id, normalize_job_role(job_role)),
+                generate_for_session, session_id, resume_text, 'cover_letter', job_role,
+                generate_cover_letter_text, resume_text, job_role
             )
-            cover_letter = response.choices[0].message.content
         
-        return jsonify({'success': True, 'cover_letter': cover_letter})
+        return jsonify({'success': True, 'cover_letter': cover_letter, 'cached': cached})
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -1276,46 +1950,161 @@ def generate_interview_questions():
         session_id = data.get('session_id')
         job_role = data.get('job_role', '')
         
-        if not session_id or session_id not in session_data:
+        session_info = session_data.get(session_id) if session_id else None
+        if not session_info:
             return jsonify({'success': False, 'error': 'Session not found'})
         
-        resume_text = session_data[session_id]['resume_text']
+        resume_text = session_info['resume_text']
+        questions = None if data.get('regenerate') else get_generated(session_info, 'interview_questions', job_role)
+        cached = questions is not None
+        if not cached:
+            questions = generations.do(
+                ('interview_questions', session_id, normalize_job_role(job_role)),
+                generate_for_session, session_id, resume_text, 'interview_questions', job_role,
+                generate_interview_questions_text, resume_text, job_role
+            )
+        
+        return jsonify({'success': True, 'questions': questions, 'cached': cached})
         
-        prompt = f"""Generate 8-12 potential interview questions for the job role: "{job_role}" based on this resume. Include:
-- 3-4 general questions about experience and background
-- 3-4 technical/skill-based questions relevant to the role
-- 2-3 behavioral questions
-- 1-2 questions about specific projects or achievements mentioned in the resume
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
 
-Format as a numbered list with clear, realistic interview questions."""
-        
-        if client:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": f"Resume content:\n\n{resume_text}"}
-                ],
-                max_tokens=1200,
-                temperature=0.7
-            )
-            questions = response.choices[0].message.content
+def report_section_role(section, job_role):
+    """Job role a report section is memoized under; job suggestions don't depend on it"""
+    return '' if section == 'job_suggestions' else job_role
+
+def run_report_section(session_id, section, resume_text, job_role):
+    """Produce one section of the full report, raising on failure"""
+    if section == 'analysis':
+        analysis = analyze_resume_with_ai(resume_text)
+        if analysis.startswith('Error'):
+            raise RuntimeError(analysis)
+        return analysis
+    if section == 'job_suggestions':
+        # Join a prefetch still in flight rather than duplicate it
+        prefetcher.wait(session_id, timeout=llm.queue_timeout)
+        suggestions = get_generated(session_data.get(session_id) or {}, section)
+        if suggestions is not None:
+            return suggestions
+        generate, args = generate_job_suggestions_text, (resume_text,)
+    elif section == 'cover_letter':
+        generate, args = generate_cover_letter_text, (resume_text, job_role)
+    elif section == 'interview_questions':
+        generate, args = generate_interview_questions_text, (resume_text, job_role)
+    else:
+        raise ValueError(f"Unknown report section: {section}")
+    
+    # Shared with the section's own route: coalesced, and memoized in the session
+    job_role = report_section_role(section, job_role)
+    return generations.do(
+        (section, session_id, normalize_job_role(job_role)),
+        generate_for_session, session_id, resume_text, section, job_role, generate, *args
+    )
+
+def stream_full_report(session_id, resume_text, analysis, job_role):
+    """Run every report section in parallel and send each one as soon as it is ready"""
+    yield sse_event('session', {
+        'session_id': session_id,
+        'resume_text': preview_resume_text(resume_text)
+    })
+    
+    sections = ['job_suggestions']
+    if job_role:
+        sections += ['cover_letter', 'interview_questions']
+    
+    completed = []
+    failed = []
+    if analysis:
+        # The session already has its analysis, no need to generate it again
+        completed.append('analysis')
+        yield sse_event('section', {'section': 'analysis', 'content': analysis})
+    
+    # Sections an earlier request already generated for this resume are sent right away
+    session_info = session_data.get(session_id) or {}
+    for section in list(sections):
+        content = get_generated(session_info, section, report_section_role(section, job_role))
+        if content is not None:
+            sections.remove(section)
+            completed.append(section)
+            yield sse_event('section', {'section': section, 'content': content})
+    if not analysis:
+        sections.insert(0, 'analysis')
+    
+    futures = {
+        submit_with_context(report_executor, run_report_section, session_id, section, resume_text, job_role): section
+        for section in sections
+    }
+    try:
+        for future in as_completed(futures):
+            section = futures[future]
+            try:
+                content = future.result()
+            except Exception as e:
+                failed.append(section)
+                yield sse_event('section_error', {'section': section, 'error': str(e)})
+                continue
+            
+            if section == 'analysis':
+                session_data.update(session_id, analysis=content)
+            completed.append(section)
+            yield sse_event('section', {'section': section, 'content': content})
+    finally:
+        # Client went away: don't start sections nobody will read
+        for future in futures:
+            future.cancel()
+    
+    yield sse_event('done', {'completed': completed, 'failed': failed})
+
+@app.route('/full-report', methods=['POST'])
+def full_report():
+    """Generate analysis, job suggestions, cover letter and interview questions in one go"""
+    try:
+        if 'file' in request.files:
+            # New resume: extract it up front so extraction errors are reported as JSON
+            file = request.files['file']
+            job_role = request.form.get('job_role', '').strip()
+            
+            if file.filename == '':
+                return jsonify({'success': False, 'error': 'No file selected'})
+            
+            if not allowed_file(file.filename):
+                return jsonify({'success': False, 'error': 'File type not allowed'})
+            
+            resume_text = extract_text_from_file(file)
+            if not resume_text or resume_text.startswith('Error'):
+                return jsonify({'success': False, 'error': resume_text})
+            
+            session_id = str(uuid.uuid4())
+            analysis = ''
+            create_session(session_id, resume_text, analysis)
         else:
-            response = openai.ChatCompletion.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": f"Resume content:\n\n{resume_text}"}
-                ],
-                max_tokens=1200,
-                temperature=0.7
-            )
-            questions = response.choices[0].message.content
+            # Existing session: reuse its resume and analysis
+            data = request.json or {}
+            session_id = data.get('session_id')
+            job_role = data.get('job_role', '').strip()
+            
+            session_info = session_data.get(session_id) if session_id else None
+            if not session_info:
+                return jsonify({'success': False, 'error': 'Session not found'})
+            
+            resume_text = session_info['resume_text']
+            analysis = session_info['analysis']
         
-        return jsonify({'success': True, 'questions': questions})
+        return Response(
+            stream_with_context(stream_full_report(session_id, resume_text, analysis, job_role)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
         
+    except RequestEntityTooLarge as e:
+        return upload_too_large(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
+    app.run(
+        debug=os.getenv('FLASK_DEBUG', '0') == '1',
+        host=os.getenv('HOST', '0.0.0.0'),
+        port=int(os.getenv('PORT', '5000'))
+    )
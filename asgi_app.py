@@ -0,0 +1,617 @@
+# Async (ASGI) variant of the web app: hypercorn asgi_app:app
+# Same routes and request/response contract as app.py, but LLM calls are awaited
+# on the async OpenAI client instead of blocking a thread each, so one process
+# can hold thousands of requests waiting on the model. Extraction (and anything
+# else that blocks) runs on a thread pool. Sessions, caches, the upload job
+# queue and prompts are shared with app.py.
+import asyncio
+import contextvars
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from quart import Quart, Request, request, jsonify, render_template_string, Response, g
+from quart.formparser import FormDataParser
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from analysis_cache import analysis_cache_key
+from jobs import QueueFull
+from extraction import extract_text_from_file
+from metrics import registry, CONTENT_TYPE, REQUEST_SECONDS, REQUESTS_IN_FLIGHT
+from request_logging import start_request
+from singleflight import AsyncSingleFlight
+from app import (
+    INDEX_HTML, UPLOAD_SPOOL_THRESHOLD, ANALYSIS_MODEL, ANALYSIS_MAX_TOKENS, ANALYSIS_CACHE_VERSION,
+    COVER_LETTER_MAX_TOKENS, INTERVIEW_QUESTIONS_MAX_TOKENS, JOB_SUGGESTIONS_PROMPT,
+    llm, session_data, analysis_cache, upload_jobs, prefetcher, shutting_down,
+    allowed_file, build_analysis_messages, build_chat_messages, build_resume_prompt_messages,
+    build_cover_letter_messages, build_interview_questions_messages, create_session,
+    preview_resume_text, prefetch_job_suggestions, record_chat_turn, run_upload_job, sse_event,
+    TimedJSONProvider, log_sample_rates, normalize_job_role, get_generated, store_generated,
+    report_section_role
+)
+
+logger = logging.getLogger(__name__)
+
+
+def spooled_stream_factory(total_content_length, content_type, filename=None, content_length=None):
+    return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_THRESHOLD, mode='rb+')
+
+
+class SpooledFormDataParser(FormDataParser):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('stream_factory', spooled_stream_factory)
+        super().__init__(*args, **kwargs)
+
+
+class SpooledUploadRequest(Request):
+    """Request that spools file uploads to disk past a configurable size"""
+    form_data_parser_class = SpooledFormDataParser
+
+
+app = Quart(__name__)
+app.secret_key = os.urandom(24)
+app.request_class = SpooledUploadRequest
+app.json = TimedJSONProvider(app)
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('UPLOAD_MAX_BYTES', str(10 * 1024 * 1024)))
+
+# Extraction blocks (on the sandbox subprocess or on parsing), so it never runs on the event loop
+extraction_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('EXTRACTION_WORKERS', '4')),
+    thread_name_prefix='extraction'
+)
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+# Identical generator requests in flight together share one LLM call, as in app.py
+generations = AsyncSingleFlight()
+
+
+async def extract_text(file):
+    loop = asyncio.get_running_loop()
+    # run_in_executor, unlike asyncio.to_thread, doesn't carry the request's context over by itself
+    return await loop.run_in_executor(extraction_executor, contextvars.copy_context().run, extract_text_from_file, file)
+
+
+async def analyze_resume(resume_text):
+    """Async version of app.analyze_resume_with_ai"""
+    try:
+        cache_key = analysis_cache_key(resume_text, ANALYSIS_CACHE_VERSION)
+        cached = analysis_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        analysis = await llm.acomplete(
+            'analysis',
+            build_analysis_messages(resume_text),
+            max_tokens=ANALYSIS_MAX_TOKENS,
+            model=ANALYSIS_MODEL
+        )
+        analysis_cache.set(cache_key, analysis)
+        return analysis
+    except Exception as e:
+        return f"Error analyzing resume: {str(e)}"
+
+
+async def generate_job_suggestions_text(resume_text):
+    return await llm.acomplete(
+        'job_suggestions',
+        build_resume_prompt_messages(JOB_SUGGESTIONS_PROMPT, resume_text),
+        max_tokens=800
+    )
+
+
+async def generate_cover_letter_text(resume_text, job_role):
+    return await llm.acomplete(
+        'cover_letter',
+        build_cover_letter_messages(resume_text, job_role),
+        max_tokens=COVER_LETTER_MAX_TOKENS
+    )
+
+
+async def generate_interview_questions_text(resume_text, job_role):
+    return await llm.acomplete(
+        'interview_questions',
+        build_interview_questions_messages(resume_text, job_role),
+        max_tokens=INTERVIEW_QUESTIONS_MAX_TOKENS
+    )
+
+
+async def generate_for_session(session_id, resume_text, route, job_role, generate, *args):
+    """Await generate(*args) and memoize the result in the session"""
+    text = await generate(*args)
+    store_generated(session_id, resume_text, route, job_role, text)
+    return text
+
+
+@app.after_serving
+async def close_llm_client():
+    await llm.aclose()
+
+
+@app.before_request
+async def start_request_tracking():
+    """Assign the request ID and count the request as in flight under its route pattern"""
+    g.metrics_route = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.metrics_started = time.perf_counter()
+    # Each request runs in its own task, so the request ID never leaks into the next one
+    g.request_id = start_request(g.metrics_route, request.headers.get('X-Request-ID'), log_sample_rates)
+    REQUESTS_IN_FLIGHT.inc(1, g.metrics_route)
+
+
+@app.after_request
+async def finish_request_tracking(response):
+    """Record latency and the access log; Quart has no close hook, so for streams this is time to the first byte"""
+    route = g.pop('metrics_route', None)
+    if route is not None:
+        seconds = time.perf_counter() - g.pop('metrics_started')
+        REQUEST_SECONDS.observe(seconds, route, request.method, str(response.status_code))
+        REQUESTS_IN_FLIGHT.dec(1, route)
+        response.headers['X-Request-ID'] = g.request_id
+        logger.info('request', extra={
+            'method': request.method,
+            'route': route,
+            'status': response.status_code,
+            'duration_ms': round(seconds * 1000, 1)
+        })
+    return response
+
+
+@app.errorhandler(413)
+async def upload_too_large(e):
+    """Reject uploads over MAX_CONTENT_LENGTH with the usual JSON error shape"""
+    limit_mb = app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+    return jsonify({'success': False, 'error': f'File too large (limit is {limit_mb} MB)'}), 413
+
+
+@app.route('/')
+async def index():
+    """Main page with upload form and chat interface"""
+    return await render_template_string(INDEX_HTML)
+
+
+@app.route('/upload', methods=['POST'])
+async def upload_resume():
+    """Handle resume upload and analysis"""
+    try:
+        files = await request.files
+        form = await request.form
+        if 'file' not in files:
+            return jsonify({'success': False, 'error': 'No file uploaded'})
+
+        file = files['file']
+        if file.filename == '':
+            return jsonify({'success': False, 'error': 'No file selected'})
+
+        if not allowed_file(file.filename):
+            return jsonify({'success': False, 'error': 'File type not allowed'})
+
+        # Async mode: hand the file to the shared background pool and return a job id
+        if request.args.get('async') or form.get('async'):
+            spooled = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_THRESHOLD, mode='rb+')
+            shutil.copyfileobj(file.stream, spooled)
+            spooled.seek(0)
+            upload = FileStorage(stream=spooled, filename=file.filename, content_type=file.content_type)
+            try:
+                job_id = upload_jobs.submit(run_upload_job, upload)
+            except QueueFull:
+                return jsonify({'success': False, 'error': 'Server is busy, please try again shortly'}), 503
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'status': 'queued',
+                'queue': upload_jobs.stats()
+            }), 202
+
+        resume_text = await extract_text(file)
+        if not resume_text or resume_text.startswith('Error'):
+            return jsonify({'success': False, 'error': resume_text})
+
+        session_id = str(uuid.uuid4())
+
+        if request.args.get('stream') or form.get('stream'):
+            return Response(
+                stream_upload_analysis(session_id, resume_text),
+                mimetype='text/event-stream',
+                headers=SSE_HEADERS
+            )
+
+        analysis = await analyze_resume(resume_text)
+        if analysis.startswith('Error'):
+            return jsonify({'success': False, 'error': analysis})
+
+        create_session(session_id, resume_text, analysis)
+        prefetch_job_suggestions(session_id, resume_text)
+        return jsonify({
+            'success': True,
+            'session_id': session_id,
+            'resume_text': preview_resume_text(resume_text),
+            'analysis': analysis
+        })
+
+    except RequestEntityTooLarge as e:
+        return await upload_too_large(e)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+
+async def stream_upload_analysis(session_id, resume_text):
+    """Stream analysis tokens for an upload and store the session once complete"""
+    yield sse_event('session', {
+        'session_id': session_id,
+        'resume_text': preview_resume_text(resume_text)
+    })
+
+    cache_key = analysis_cache_key(resume_text, ANALYSIS_CACHE_VERSION)
+    analysis = analysis_cache.get(cache_key)
+    if analysis is not None:
+        yield sse_event('token', {'text': analysis})
+    else:
+        parts = []
+        try:
+            async for text in llm.astream('analysis', build_analysis_messages(resume_text),
+                                          max_tokens=ANALYSIS_MAX_TOKENS, model=ANALYSIS_MODEL):
+                parts.append(text)
+                yield sse_event('token', {'text': text})
+        except Exception as e:
+            yield sse_event('error', {'error': f"Error analyzing resume: {str(e)}"})
+            return
+        analysis = ''.join(parts)
+        analysis_cache.set(cache_key, analysis)
+
+    create_session(session_id, resume_text, analysis)
+    prefetch_job_suggestions(session_id, resume_text)
+    yield sse_event('done', {'session_id': session_id})
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+async def get_job(job_id):
+    """Report the status of an asynchronous upload job, with its result when finished"""
+    job = upload_jobs.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'})
+
+    response = {
+        'success': True,
+        'job_id': job_id,
+        'status': job['status'],
+        'queue': upload_jobs.stats()
+    }
+    if job['status'] == 'done':
+        response['result'] = job['result']
+    elif job['status'] == 'failed':
+        response['error'] = job['error']
+    return jsonify(response)
+
+
+@app.route('/stats', methods=['GET'])
+async def stats():
+    """Report cache, session store, upload queue, LLM gateway and prefetch counters"""
+    return jsonify({
+        'success': True,
+        'analysis_cache': analysis_cache.stats(),
+        'sessions': session_data.stats(),
+        'upload_jobs': upload_jobs.stats(),
+        'llm': llm.stats(),
+        'prefetch': prefetcher.stats(),
+        'generations': generations.stats()
+    })
+
+
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    """Prometheus text exposition of latency histograms, token counts and gauges"""
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
+
+@app.route('/healthz', methods=['GET'])
+async def healthz():
+    """Liveness check: the process is up and serving requests"""
+    return jsonify({'status': 'ok'})
+
+
+@app.route('/readyz', methods=['GET'])
+async def readyz():
+    """Readiness check: not shutting down and able to take new uploads"""
+    queue = upload_jobs.stats()
+    checks = {
+        'accepting_requests': not shutting_down.is_set(),
+        'upload_queue': queue['queued'] < queue['max_queued']
+    }
+    ready = all(checks.values())
+    return jsonify({'status': 'ready' if ready else 'not ready', 'checks': checks}), 200 if ready else 503
+
+
+@app.route('/chat', methods=['POST'])
+async def chat():
+    """Handle chat messages with AI resume coach"""
+    try:
+        data = await request.get_json()
+        session_id = data.get('session_id')
+        user_message = data.get('user_message', '')
+
+        if not session_id or not user_message:
+            return jsonify({'success': False, 'error': 'Missing required data'})
+
+        session_info = session_data.get(session_id)
+        if not session_info:
+            return jsonify({'success': False, 'error': 'Session not found'})
+
+        messages = build_chat_messages(session_info, user_message)
+
+        if data.get('stream'):
+            return Response(
+                stream_chat_reply(session_id, user_message, messages),
+                mimetype='text/event-stream',
+                headers=SSE_HEADERS
+            )
+
+        ai_reply = await llm.acomplete('chat', messages, max_tokens=800)
+        record_chat_turn(session_id, user_message, ai_reply)
+        return jsonify({'success': True, 'ai_reply': ai_reply})
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+
+async def stream_chat_reply(session_id, user_message, messages):
+    """Stream a coach reply and commit it to the session only once complete"""
+    parts = []
+    try:
+        async for text in llm.astream('chat', messages, max_tokens=800):
+            parts.append(text)
+            yield sse_event('token', {'text': text})
+    except Exception as e:
+        yield sse_event('error', {'error': str(e)})
+        return
+
+    ai_reply = ''.join(parts)
+    record_chat_turn(session_id, user_message, ai_reply)
+    yield sse_event('done', {'ai_reply': ai_reply})
+
+
+@app.route('/prefetch/cancel', methods=['POST'])
+async def cancel_prefetch():
+    """Cancel a pending speculative prefetch for a session"""
+    data = await request.get_json() or {}
+    session_id = data.get('session_id')
+    if not session_id:
+        return jsonify({'success': False, 'error': 'Missing required data'})
+    return jsonify({'success': True, 'cancelled': prefetcher.cancel(session_id)})
+
+
+@app.route('/job-suggestions', methods=['POST'])
+async def get_job_suggestions():
+    """Generate job role suggestions based on resume"""
+    try:
+        data = await request.get_json()
+        session_id = data.get('session_id')
+        regenerate = bool(data.get('regenerate'))
+
+        # Prefetches run on threads; wait for one off the event loop
+        if session_id and regenerate:
+            prefetcher.cancel(session_id)
+        elif session_id:
+            await asyncio.to_thread(prefetcher.wait, session_id, llm.queue_timeout)
+
+        session_info = session_data.get(session_id) if session_id else None
+        if not session_info:
+            return jsonify({'success': False, 'error': 'Session not found'})
+
+        resume_text = session_info['resume_text']
+        suggestions = None if regenerate else get_generated(session_info, 'job_suggestions')
+        cached = suggestions is not None
+        if not cached:
+            suggestions = await generations.do(
+                ('job_suggestions', session_id, ''),
+                generate_for_session, session_id, resume_text, 'job_suggestions', '',
+                generate_job_suggestions_text, resume_text
+            )
+
+        return jsonify({'success': True, 'suggestions': suggestions, 'cached': cached})
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+
+@app.route('/cover-letter', methods=['POST'])
+async def generate_cover_letter():
+    """Generate personalized cover letter"""
+    try:
+        data = await request.get_json()
+        session_id = data.get('session_id')
+        job_role = data.get('job_role', '')
+
+        session_info = session_data.get(session_id) if session_id else None
+        if not session_info:
+            return jsonify({'success': False, 'error': 'Session not found'})
+
+        resume_text = session_info['resume_text']
+        cover_letter = None if data.get('regenerate') else get_generated(session_info, 'cover_letter', job_role)
+        cached = cover_letter is not None
+        if not cached:
+            cover_letter = await generations.do(
+                ('cover_letter', session_id, normalize_job_role(job_role)),
+                generate_for_session, session_id, resume_text, 'cover_letter', job_role,
+                generate_cover_letter_text, resume_text, job_role
+            )
+        return jsonify({'success': True, 'cover_letter': cover_letter, 'cached': cached})
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+
+@app.route('/interview-questions', methods=['POST'])
+async def generate_interview_questions():
+    """Generate interview questions based on resume and job role"""
+    try:
+        data = await request.get_json()
+        session_id = data.get('session_id')
+        job_role = data.get('job_role', '')
+
+        session_info = session_data.get(session_id) if session_id else None
+        if not session_info:
+            return jsonify({'success': False, 'error': 'Session not found'})
+
+        resume_text = session_info['resume_text']
+        questions = None if data.get('regenerate') else get_generated(session_info, 'interview_questions', job_role)
+        cached = questions is not None
+        if not cached:
+            questions = await generations.do(
+                ('interview_questions', session_id, normalize_job_role(job_role)),
+                generate_for_session, session_id, resume_text, 'interview_questions', job_role,
+                generate_interview_questions_text, resume_text, job_role
+            )
+        return jsonify({'success': True, 'questions': questions, 'cached': cached})
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+
+async def run_report_section(session_id, section, resume_text, job_role):
+    """Produce one section of the full report, raising on failure"""
+    if section == 'analysis':
+        analysis = await analyze_resume(resume_text)
+        if analysis.startswith('Error'):
+            raise RuntimeError(analysis)
+        return analysis
+    if section == 'job_suggestions':
+        # Join a prefetch still in flight rather than duplicate it
+        await asyncio.to_thread(prefetcher.wait, session_id, llm.queue_timeout)
+        suggestions = get_generated(session_data.get(session_id) or {}, section)
+        if suggestions is not None:
+            return suggestions
+        generate, args = generate_job_suggestions_text, (resume_text,)
+    elif section == 'cover_letter':
+        generate, args = generate_cover_letter_text, (resume_text, job_role)
+    elif section == 'interview_questions':
+        generate, args = generate_interview_questions_text, (resume_text, job_role)
+    else:
+        raise ValueError(f"Unknown report section: {section}")
+
+    # Shared with the section's own route: coalesced, and memoized in the session
+    job_role = report_section_role(section, job_role)
+    return await generations.do(
+        (section, session_id, normalize_job_role(job_role)),
+        generate_for_session, session_id, resume_text, section, job_role, generate, *args
+    )
+
+
+async def run_labelled_section(session_id, section, resume_text, job_role):
+    try:
+        return section, await run_report_section(session_id, section, resume_text, job_role), None
+    except Exception as e:
+        return section, None, e
+
+
+async def stream_full_report(session_id, resume_text, analysis, job_role):
+    """Run every report section concurrently and send each one as soon as it is ready"""
+    yield sse_event('session', {
+        'session_id': session_id,
+        'resume_text': preview_resume_text(resume_text)
+    })
+
+    sections = ['job_suggestions']
+    if job_role:
+        sections += ['cover_letter', 'interview_questions']
+
+    completed = []
+    failed = []
+    if analysis:
+        completed.append('analysis')
+        yield sse_event('section', {'section': 'analysis', 'content': analysis})
+
+    # Sections an earlier request already generated for this resume are sent right away
+    session_info = session_data.get(session_id) or {}
+    for section in list(sections):
+        content = get_generated(session_info, section, report_section_role(section, job_role))
+        if content is not None:
+            sections.remove(section)
+            completed.append(section)
+            yield sse_event('section', {'section': section, 'content': content})
+    if not analysis:
+        sections.insert(0, 'analysis')
+
+    tasks = [
+        asyncio.ensure_future(run_labelled_section(session_id, section, resume_text, job_role))
+        for section in sections
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            section, content, error = await next_done
+            if error is not None:
+                failed.append(section)
+                yield sse_event('section_error', {'section': section, 'error': str(error)})
+                continue
+
+            if section == 'analysis':
+                session_data.update(session_id, analysis=content)
+            completed.append(section)
+            yield sse_event('section', {'section': section, 'content': content})
+    finally:
+        # Client went away: stop sections nobody will read
+        for task in tasks:
+            task.cancel()
+
+    yield sse_event('done', {'completed': completed, 'failed': failed})
+
+
+@app.route('/full-report', methods=['POST'])
+async def full_report():
+    """Generate analysis, job suggestions, cover letter and interview questions in one go"""
+    try:
+        files = await request.files
+        if 'file' in files:
+            file = files['file']
+            form = await request.form
+            job_role = form.get('job_role', '').strip()
+
+            if file.filename == '':
+                return jsonify({'success': False, 'error': 'No file selected'})
+
+            if not allowed_file(file.filename):
+                return jsonify({'success': False, 'error': 'File type not allowed'})
+
+            resume_text = await extract_text(file)
+            if not resume_text or resume_text.startswith('Error'):
+                return jsonify({'success': False, 'error': resume_text})
+
+            session_id = str(uuid.uuid4())
+            analysis = ''
+            create_session(session_id, resume_text, analysis)
+        else:
+            data = await request.get_json(silent=True) or {}
+            session_id = data.get('session_id')
+            job_role = data.get('job_role', '').strip()
+
+            session_info = session_data.get(session_id) if session_id else None
+            if not session_info:
+                return jsonify({'success': False, 'error': 'Session not found'})
+
+            resume_text = session_info['resume_text']
+            analysis = session_info['analysis']
+
+        return Response(
+            stream_full_report(session_id, resume_text, analysis, job_role),
+            mimetype='text/event-stream',
+            headers=SSE_HEADERS
+        )
+
+    except RequestEntityTooLarge as e:
+        return await upload_too_large(e)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+
+if __name__ == '__main__':
+    # Development server only; production runs under hypercorn
+    app.run(
+        debug=os.getenv('FLASK_DEBUG', '0') == '1',
+        host=os.getenv('HOST', '0.0.0.0'),
+        port=int(os.getenv('PORT', '5000'))
+    )
@@ -0,0 +1,368 @@
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+from llm_gateway import DEFAULT_MODEL
+
+BATCH_ENDPOINT = '/v1/chat/completions'
+# Provider limit on requests per batch file
+MAX_BATCH_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', '50000'))
+TERMINAL_STATUSES = {'completed', 'failed', 'expired', 'cancelled'}
+TASKS = ('analysis', 'cover_letter', 'interview_questions')
+
+
+def batch_request(custom_id, messages, max_tokens, model, temperature=0.7):
+    """One line of a chat-completions batch input file"""
+    return {
+        'custom_id': custom_id,
+        'method': 'POST',
+        'url': BATCH_ENDPOINT,
+        'body': {
+            'model': model,
+            'messages': messages,
+            'max_tokens': max_tokens,
+            'temperature': temperature
+        }
+    }
+
+
+def parse_batch_output(text):
+    """Map custom_id -> (content, error) for every line of a batch output or error file"""
+    results = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get('response') or {}
+        if record.get('error') or response.get('status_code') != 200:
+            error = record.get('error') or response.get('body', {}).get('error') or {}
+            results[record['custom_id']] = (None, error.get('message') or f"status {response.get('status_code')}")
+            continue
+        results[record['custom_id']] = (response['body']['choices'][0]['message']['content'], None)
+    return results
+
+
+class OpenAIBatchBackend:
+    """Submits batch files through the provider's files and batches APIs"""
+
+    def __init__(self, client, completion_window='24h'):
+        self.client = client
+        self.completion_window = completion_window
+
+    def upload(self, path):
+        with open(path, 'rb') as f:
+            return self.client.files.create(file=f, purpose='batch').id
+
+    def create(self, input_file_id, metadata=None):
+        batch = self.client.batches.create(
+            input_file_id=input_file_id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=self.completion_window,
+            metadata=metadata
+        )
+        return batch.id
+
+    def retrieve(self, batch_id):
+        batch = self.client.batches.retrieve(batch_id)
+        return {
+            'status': batch.status,
+            'output_file_id': batch.output_file_id,
+            'error_file_id': batch.error_file_id
+        }
+
+    def download(self, file_id):
+        return self.client.files.content(file_id).text
+
+
+class LocalBatchBackend:
+    """Stand-in for the batch endpoint that keeps its files on local disk
+
+    Batches report in_progress until complete_after seconds have passed, then
+    complete with respond(custom_id, body) as each answer. State lives in
+    directory, so separate submit and collect runs see the same batches.
+    """
+
+    def __init__(self, directory, respond=None, complete_after=0.0):
+        self.directory = directory
+        self.respond = respond or self.placeholder_response
+        self.complete_after = complete_after
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def placeholder_response(custom_id, body):
+        return f"[local batch] {body['model']} response for {custom_id}"
+
+    def upload(self, path):
+        file_id = f"file-local-{uuid.uuid4().hex}"
+        with open(path, 'rb') as src, open(self._path(file_id), 'wb') as dst:
+            dst.write(src.read())
+        return file_id
+
+    def create(self, input_file_id, metadata=None):
+        batch_id = f"batch-local-{uuid.uuid4().hex}"
+        self._save(batch_id, {
+            'status': 'in_progress',
+            'created_at': time.time(),
+            'input_file_id': input_file_id,
+            'output_file_id': None,
+            'error_file_id': None,
+            'metadata': metadata
+        })
+        return batch_id
+
+    def retrieve(self, batch_id):
+        with open(self._path(batch_id), 'r', encoding='utf-8') as f:
+            batch = json.load(f)
+        if batch['status'] == 'in_progress' and time.time() - batch['created_at'] >= self.complete_after:
+            batch['output_file_id'], batch['error_file_id'] = self._run(batch['input_file_id'])
+            batch['status'] = 'completed'
+            self._save(batch_id, batch)
+        return {key: batch[key] for key in ('status', 'output_file_id', 'error_file_id')}
+
+    def download(self, file_id):
+        with open(self._path(file_id), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def _run(self, input_file_id):
+        output, errors = [], []
+        for line in self.download(input_file_id).splitlines():
+            request = json.loads(line)
+            try:
+                content = self.respond(request['custom_id'], request['body'])
+            except Exception as e:
+                errors.append({
+                    'id': f"batch_req_{uuid.uuid4().hex}",
+                    'custom_id': request['custom_id'],
+                    'response': None,
+                    'error': {'code': 'local_error', 'message': str(e)}
+                })
+                continue
+            output.append({
+                'id': f"batch_req_{uuid.uuid4().hex}",
+                'custom_id': request['custom_id'],
+                'response': {
+                    'status_code': 200,
+                    'request_id': uuid.uuid4().hex,
+                    'body': {
+                        'object': 'chat.completion',
+                        'model': request['body']['model'],
+                        'choices': [{
+                            'index': 0,
+                            'message': {'role': 'assistant', 'content': content},
+                            'finish_reason': 'stop'
+                        }]
+                    }
+                },
+                'error': None
+            })
+        return self._write_file(output), self._write_file(errors) if errors else None
+
+    def _write_file(self, records):
+        file_id = f"file-local-{uuid.uuid4().hex}"
+        with open(self._path(file_id), 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+        return file_id
+
+    def _save(self, batch_id, batch):
+        with open(self._path(batch_id), 'w', encoding='utf-8') as f:
+            json.dump(batch, f)
+
+    def _path(self, object_id):
+        return os.path.join(self.directory, object_id)
+
+
+def record_key(record):
+    """Sessions are identified by session_id, bulk ingestion results by path"""
+    return record.get('session_id') or record.get('path')
+
+
+def prepare(records_path, batch_dir, tasks, job_roles):
+    """Write batch input files plus a manifest mapping each custom_id back to its session"""
+    # Imported here so the prompts and token limits match the web app exactly
+    import app
+
+    os.makedirs(batch_dir, exist_ok=True)
+    manifest = {}
+    requests = []
+    with open(records_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('status', 'ok') != 'ok' or not record.get('resume_text') or not record_key(record):
+                continue
+            resume_text = record['resume_text']
+            jobs = []
+            if 'analysis' in tasks:
+                jobs.append(('analysis', None, app.build_analysis_messages(resume_text),
+                             app.ANALYSIS_MAX_TOKENS, app.ANALYSIS_MODEL))
+            for job_role in job_roles:
+                if 'cover_letter' in tasks:
+                    jobs.append(('cover_letter', job_role, app.build_cover_letter_messages(resume_text, job_role),
+                                 app.COVER_LETTER_MAX_TOKENS, DEFAULT_MODEL))
+                if 'interview_questions' in tasks:
+                    jobs.append(('interview_questions', job_role,
+                                 app.build_interview_questions_messages(resume_text, job_role),
+                                 app.INTERVIEW_QUESTIONS_MAX_TOKENS, DEFAULT_MODEL))
+            for task, job_role, messages, max_tokens, model in jobs:
+                custom_id = f"req-{len(requests)}"
+                manifest[custom_id] = {'key': record_key(record), 'task': task, 'job_role': job_role}
+                if task == 'analysis':
+                    # Lets collect fill the analysis cache without keeping the resume around
+                    manifest[custom_id]['cache_key'] = app.analysis_cache_key(resume_text, app.ANALYSIS_CACHE_VERSION)
+                requests.append(batch_request(custom_id, messages, max_tokens, model))
+
+    input_files = []
+    for start in range(0, len(requests), MAX_BATCH_REQUESTS):
+        path = os.path.join(batch_dir, f"input-{len(input_files):03d}.jsonl")
+        with open(path, 'w', encoding='utf-8') as f:
+            for item in requests[start:start + MAX_BATCH_REQUESTS]:
+                f.write(json.dumps(item) + '\n')
+        input_files.append(os.path.basename(path))
+
+    save_state(batch_dir, {'manifest': manifest, 'input_files': input_files, 'batches': []})
+    print(f"{len(requests)} requests written to {len(input_files)} batch file(s) in {batch_dir}", file=sys.stderr)
+
+
+def submit(batch_dir, backend):
+    """Upload every prepared input file and start a batch for it; rerun to resume after a failure"""
+    state = load_state(batch_dir)
+    submitted = {batch['input_file'] for batch in state['batches']}
+    remaining = [filename for filename in state['input_files'] if filename not in submitted]
+    if not remaining:
+        print("Batches already submitted; run collect", file=sys.stderr)
+        return
+    for filename in remaining:
+        file_id = backend.upload(os.path.join(batch_dir, filename))
+        batch_id = backend.create(file_id, metadata={'source': filename})
+        state['batches'].append({'id': batch_id, 'input_file': filename, 'status': 'in_progress'})
+        # Saved per batch, so a later failure never loses (and a rerun never pays for) one already created
+        save_state(batch_dir, state)
+        print(f"Submitted {filename} as {batch_id}", file=sys.stderr)
+
+
+def collect(batch_dir, backend, output_path, wait=False, poll_interval=60.0):
+    """Download finished batches and write one result line per session; returns True when all are done"""
+    state = load_state(batch_dir)
+    while True:
+        for batch in state['batches']:
+            if batch['status'] not in TERMINAL_STATUSES:
+                batch.update(backend.retrieve(batch['id']))
+        save_state(batch_dir, state)
+        pending = [batch['id'] for batch in state['batches'] if batch['status'] not in TERMINAL_STATUSES]
+        if not pending or not wait:
+            break
+        print(f"{len(pending)} batch(es) still running", file=sys.stderr)
+        time.sleep(poll_interval)
+    if pending:
+        print(f"{len(pending)} batch(es) still running; collect again later", file=sys.stderr)
+        return False
+
+    results = {}
+    for batch in state['batches']:
+        # Expired or cancelled batches can still carry partial output
+        for file_id in (batch.get('output_file_id'), batch.get('error_file_id')):
+            if file_id:
+                results.update(parse_batch_output(backend.download(file_id)))
+
+    from app import analysis_cache
+    # This process's memory cache is gone when it exits; only the disk tier reaches the web app
+    cache_analyses = analysis_cache.disk_dir is not None
+
+    sessions = {}
+    analyses = 0
+    for custom_id, entry in state['manifest'].items():
+        content, error = results.get(custom_id, (None, 'no result returned'))
+        session = sessions.setdefault(entry['key'], {'key': entry['key'], 'errors': {}})
+        label = entry['task'] if not entry['job_role'] else f"{entry['task']}:{entry['job_role']}"
+        if error:
+            session['errors'][label] = error
+        elif entry['task'] == 'analysis':
+            session['analysis'] = content
+            analyses += 1
+            if cache_analyses:
+                analysis_cache.set(entry['cache_key'], content)
+        else:
+            session.setdefault(entry['task'], {})[entry['job_role']] = content
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for session in sessions.values():
+            f.write(json.dumps(session) + '\n')
+    failed = sum(len(session['errors']) for session in sessions.values())
+    print(f"{len(sessions)} sessions written to {output_path}, {failed} failed requests", file=sys.stderr)
+    if analyses and not cache_analyses:
+        print("ANALYSIS_CACHE_DIR is not set: analyses were written to the output file only, "
+              "not to the web app's analysis cache", file=sys.stderr)
+    return True
+
+
+def load_state(batch_dir):
+    with open(os.path.join(batch_dir, 'state.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(batch_dir, state):
+    path = os.path.join(batch_dir, 'state.json')
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(path + '.tmp', path)
+
+
+def make_backend(name, batch_dir):
+    if name == 'local':
+        return LocalBatchBackend(
+            os.getenv('BATCH_LOCAL_DIR', os.path.join(batch_dir, 'local-backend')),
+            complete_after=float(os.getenv('BATCH_LOCAL_DELAY', '0'))
+        )
+    from app import llm
+    if not llm.client:
+        raise SystemExit("The OpenAI client is not available; batch submission needs it")
+    return OpenAIBatchBackend(llm.client)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run analysis and generator prompts through the batch API.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    prepare_cmd = commands.add_parser('prepare', help='build batch input files from a JSONL of resumes')
+    prepare_cmd.add_argument('records', help='JSONL with resume_text and session_id or path (e.g. bulk_ingest output)')
+    prepare_cmd.add_argument('batch_dir', help='folder for the batch files and state')
+    prepare_cmd.add_argument('--tasks', default='analysis',
+                             help=f"comma-separated subset of {','.join(TASKS)} (default: analysis)")
+    prepare_cmd.add_argument('--job-role', action='append', default=[],
+                             help='job role for cover letters and interview questions; repeatable')
+
+    for name, help_text in (('submit', 'upload the prepared files and start the batches'),
+                            ('collect', 'fetch finished batches and map results back to sessions')):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('batch_dir')
+        command.add_argument('--backend', choices=('openai', 'local'), default='openai',
+                             help='batch endpoint to use; local is an on-disk stand-in for testing')
+        if name == 'collect':
+            command.add_argument('output', help='JSONL file with one result line per session')
+            command.add_argument('--wait', action='store_true', help='poll until every batch has finished')
+            command.add_argument('--poll-interval', type=float, default=60.0)
+
+    args = parser.parse_args()
+    if args.command == 'prepare':
+        tasks = [task.strip() for task in args.tasks.split(',') if task.strip()]
+        unknown = set(tasks) - set(TASKS)
+        if unknown:
+            parser.error(f"unknown tasks: {', '.join(sorted(unknown))}")
+        if set(tasks) - {'analysis'} and not args.job_role:
+            parser.error('cover_letter and interview_questions need at least one --job-role')
+        prepare(args.records, args.batch_dir, tasks, args.job_role)
+    elif args.command == 'submit':
+        submit(args.batch_dir, make_backend(args.backend, args.batch_dir))
+    elif not collect(args.batch_dir, make_backend(args.backend, args.batch_dir), args.output,
+                     wait=args.wait, poll_interval=args.poll_interval):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
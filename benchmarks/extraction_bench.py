@@ -0,0 +1,195 @@
+# Microbenchmarks for the text-extraction hot path: extract_text_from_pdf,
+# extract_text_from_docx and the TXT decoder, over synthetic resumes of varying
+# size, page count, fonts and tables. Reports MB/s, pages/s and peak Python heap
+# per case. Save a run with --save and check a later one against it with --compare.
+#
+#   python benchmarks/extraction_bench.py --save extraction-baseline.json
+#   python benchmarks/extraction_bench.py --compare extraction-baseline.json
+import argparse
+import hashlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import PyPDF2
+from werkzeug.datastructures import FileStorage
+
+import extraction
+from extraction import extract_text_from_pdf, extract_text_from_docx, extract_text_from_file, decode_text
+from synthetic_docs import make_pdf, make_docx, make_txt
+
+# name -> (kind, generator, kwargs, pages); plain text has no pages
+CASES = {
+    'pdf-1p-helvetica': ('pdf', make_pdf, {'pages': 1}, 1),
+    'pdf-2p-times': ('pdf', make_pdf, {'pages': 2, 'font': 'times'}, 2),
+    'pdf-5p-courier-tables': ('pdf', make_pdf, {'pages': 5, 'font': 'courier', 'table_rows': 12}, 5),
+    'pdf-5p-compressed': ('pdf', make_pdf, {'pages': 5, 'compress': True}, 5),
+    'pdf-20p': ('pdf', make_pdf, {'pages': 20}, 20),
+    'pdf-50p-compressed': ('pdf', make_pdf, {'pages': 50, 'compress': True}, 50),
+    'docx-1p': ('docx', make_docx, {'pages': 1}, 1),
+    'docx-3p-tables': ('docx', make_docx, {'pages': 3, 'tables': 2, 'font': 'times'}, 3),
+    'docx-10p-tables': ('docx', make_docx, {'pages': 10, 'tables': 3, 'table_rows': 10}, 10),
+    'txt-4k-utf8': ('txt', make_txt, {'size_bytes': 4 * 1024}, None),
+    'txt-256k-utf8': ('txt', make_txt, {'size_bytes': 256 * 1024}, None),
+    'txt-1m-utf16': ('txt', make_txt, {'size_bytes': 1024 * 1024, 'encoding': 'utf-16'}, None),
+    'txt-1m-cp1252': ('txt', make_txt, {'size_bytes': 1024 * 1024, 'encoding': 'cp1252'}, None),
+}
+QUICK_CASES = ['pdf-2p-times', 'pdf-20p', 'docx-3p-tables', 'txt-256k-utf8', 'txt-1m-cp1252']
+
+EXTRACTORS = {
+    'pdf': lambda data: extract_text_from_pdf(io.BytesIO(data)),
+    'docx': lambda data: extract_text_from_docx(io.BytesIO(data)),
+    'txt': decode_text,
+}
+
+
+def upload_extractor(kind):
+    """Whole upload path: format detection, prechecks and (if enabled) the sandbox"""
+    def run(data):
+        return extract_text_from_file(FileStorage(stream=io.BytesIO(data), filename=f"resume.{kind}"))
+    return run
+
+
+def measure(extract, data, repeat, warmup):
+    """Median and best wall time over repeat runs, plus peak traced allocation of one run"""
+    for _ in range(warmup):
+        text = extract(data)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        text = extract(data)
+        timings.append(time.perf_counter() - started)
+
+    # Measured separately: tracing allocations slows extraction down a lot
+    tracemalloc.start()
+    extract(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), min(timings), peak, text
+
+
+def run_case(name, repeat, warmup, mode, seed):
+    kind, generator, kwargs, pages = CASES[name]
+    data = generator(seed=seed, **kwargs)
+    extract = upload_extractor(kind) if mode == 'upload' else EXTRACTORS[kind]
+    median, best, peak, text = measure(extract, data, repeat, warmup)
+    if isinstance(text, str) and text.startswith('Error'):
+        raise RuntimeError(f"{name}: {text}")
+    megabytes = len(data) / (1024 * 1024)
+    return {
+        'kind': kind,
+        'bytes': len(data),
+        'pages': pages,
+        'input_sha256': hashlib.sha256(data).hexdigest()[:16],
+        'chars': len(text),
+        'median_ms': round(median * 1000, 3),
+        'best_ms': round(best * 1000, 3),
+        'mb_per_s': round(megabytes / median, 2),
+        'pages_per_s': round(pages / median, 1) if pages else None,
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def environment(mode):
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'pypdf2': PyPDF2.__version__,
+        'mode': mode,
+        'pdf_workers': extraction.PDF_WORKERS,
+        'pdf_parallel_min_pages': extraction.PDF_PARALLEL_MIN_PAGES,
+        'sandbox': extraction.EXTRACTION_SANDBOX if mode == 'upload' else False,
+    }
+
+
+def print_results(results):
+    header = f"{'case':<24}{'size KB':>9}{'median ms':>11}{'MB/s':>8}{'pages/s':>9}{'peak KB':>10}"
+    print(header)
+    print('-' * len(header))
+    for name, result in results.items():
+        pages_per_s = result['pages_per_s'] if result['pages_per_s'] is not None else '-'
+        print(f"{name:<24}{result['bytes'] / 1024:>9.1f}{result['median_ms']:>11}{result['mb_per_s']:>8}"
+              f"{pages_per_s:>9}{result['peak_kb']:>10}")
+
+
+def compare(results, baseline, tolerance):
+    """Cases that got slower or hungrier than baseline by more than tolerance"""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            continue
+        if previous['input_sha256'] != result['input_sha256']:
+            print(f"Warning: {name} input differs from the baseline's; skipping", file=sys.stderr)
+            continue
+        if result['median_ms'] > previous['median_ms'] * (1 + tolerance):
+            regressions.append(f"{name} median: {previous['median_ms']} -> {result['median_ms']} ms")
+        if result['peak_kb'] > previous['peak_kb'] * (1 + tolerance):
+            regressions.append(f"{name} peak memory: {previous['peak_kb']} -> {result['peak_kb']} KB")
+        if result['chars'] != previous['chars']:
+            regressions.append(f"{name} extracted {result['chars']} characters, baseline had {previous['chars']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark PDF, DOCX and TXT text extraction.')
+    parser.add_argument('cases', nargs='*', help=f"cases to run (default: all); one of {', '.join(CASES)}")
+    parser.add_argument('--quick', action='store_true', help=f"run only {', '.join(QUICK_CASES)}")
+    parser.add_argument('--repeat', type=int, default=7, help='timed runs per case (default: 7)')
+    parser.add_argument('--warmup', type=int, default=1, help='untimed runs per case first (default: 1)')
+    parser.add_argument('--mode', choices=('extractor', 'upload'), default='extractor',
+                        help='time the extractor functions alone, or the whole extract_text_from_file path')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the synthetic documents')
+    parser.add_argument('--list', action='store_true', help='list the cases and exit')
+    parser.add_argument('--save', help='write results as JSON, e.g. as a baseline')
+    parser.add_argument('--compare', help='baseline JSON from an earlier --save run')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='allowed relative slowdown or memory growth (default: 0.15)')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, (kind, _, kwargs, _) in CASES.items():
+            print(f"{name:<24}{kind:<6}{kwargs}")
+        return
+
+    names = args.cases or (QUICK_CASES if args.quick else list(CASES))
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    results = {}
+    for name in names:
+        print(f"Running {name}...", file=sys.stderr)
+        results[name] = run_case(name, args.repeat, args.warmup, args.mode, args.seed)
+    print_results(results)
+
+    report = {'environment': environment(args.mode), 'seed': args.seed, 'results': results}
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('environment') != report['environment']:
+            print("Warning: baseline was recorded in a different environment; timings may not be comparable",
+                  file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == '__main__':
+    main()
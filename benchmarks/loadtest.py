@@ -0,0 +1,297 @@
+# End-to-end load test for the web app. Run it against a server whose
+# OPENAI_BASE_URL points at benchmarks/mock_openai.py so results don't depend on
+# (or pay for) the real API. The request mix is drawn from a seeded generator, so
+# two runs with the same arguments send the same requests; save a run with
+# --output and check a later one against it with --compare.
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+import uuid
+
+import httpx
+
+OPERATIONS = ('upload', 'chat', 'chat_stream', 'job_suggestions', 'cover_letter', 'interview_questions')
+DEFAULT_MIX = 'upload=1,chat=4,chat_stream=2,job_suggestions=1,cover_letter=1,interview_questions=1'
+JOB_ROLES = ['Data Scientist', 'Backend Engineer', 'Product Manager', 'DevOps Engineer', 'ML Engineer']
+SKILLS = ['Python', 'SQL', 'Docker', 'Kubernetes', 'React', 'AWS', 'Spark', 'Go', 'TensorFlow', 'Terraform']
+# Operations with fewer requests than this are left out of per-operation comparisons
+MIN_COMPARE_SAMPLES = 50
+
+
+def parse_mix(spec):
+    """Parse "chat=4,upload=1" into {'chat': 4.0, 'upload': 1.0}"""
+    mix = {}
+    for item in spec.split(','):
+        if '=' in item:
+            name, weight = item.split('=', 1)
+            name = name.strip()
+            if name not in OPERATIONS:
+                raise ValueError(f"Unknown operation '{name}', expected one of {', '.join(OPERATIONS)}")
+            mix[name] = float(weight)
+    return mix
+
+
+def synthetic_resume(rng, nonce):
+    """A plausible plain-text resume; nonce keeps the analysis cache from answering it"""
+    skills = ', '.join(rng.sample(SKILLS, 5))
+    years = rng.randint(1, 15)
+    jobs = '\n'.join(
+        f"- {rng.choice(JOB_ROLES)} at Company {rng.randint(1, 500)} ({rng.randint(1, 5)} years): "
+        f"built and operated services using {rng.choice(SKILLS)} and {rng.choice(SKILLS)}"
+        for _ in range(rng.randint(2, 5))
+    )
+    return (f"Candidate {nonce}\nSummary: engineer with {years} years of experience.\n"
+            f"Skills: {skills}\nExperience:\n{jobs}\nEducation: BSc Computer Science\n")
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples, elapsed):
+    """Latency percentiles (ms), throughput and error rate for a list of samples"""
+    latencies = sorted(sample['latency'] for sample in samples)
+    errors = sum(1 for sample in samples if not sample['ok'])
+    summary = {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': errors / len(samples) if samples else 0.0,
+        'throughput': len(samples) / elapsed if elapsed else 0.0
+    }
+    for pct in (50, 95, 99):
+        value = percentile(latencies, pct)
+        summary[f'p{pct}_ms'] = round(value * 1000, 1) if value is not None else None
+    first_tokens = sorted(sample['first_token'] for sample in samples if sample.get('first_token') is not None)
+    if first_tokens:
+        summary['ttft_p50_ms'] = round(percentile(first_tokens, 50) * 1000, 1)
+        summary['ttft_p95_ms'] = round(percentile(first_tokens, 95) * 1000, 1)
+    return summary
+
+
+class LoadTest:
+    """Drives the app's endpoints from a pool of threads with a seeded request mix"""
+
+    def __init__(self, base_url, concurrency, mix, seed=0, sessions=20, timeout=120.0):
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        self.mix = mix
+        self.seed = seed
+        self.session_count = sessions
+        self.timeout = timeout
+        self.nonce = uuid.uuid4().hex[:8]
+        self.sessions = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def client(self):
+        # One keep-alive connection pool per worker thread
+        if not hasattr(self._local, 'client'):
+            self._local.client = httpx.Client(base_url=self.base_url, timeout=self.timeout)
+        return self._local.client
+
+    def setup(self):
+        """Create the sessions that chat and generator requests run against"""
+        rng = random.Random(self.seed)
+        for index in range(self.session_count):
+            ok, session_id = self.upload(synthetic_resume(rng, f"{self.nonce}-setup-{index}"))
+            if not ok:
+                raise RuntimeError(f"Could not create a session: {session_id}")
+            self.sessions.append(session_id)
+
+    def plan(self, count):
+        """The seeded sequence of (operation, argument rng seed) pairs for a run"""
+        rng = random.Random(self.seed)
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        return [(rng.choices(names, weights)[0], rng.random()) for _ in range(count)]
+
+    def run(self, requests=None, duration=None):
+        """Send the planned requests (or keep cycling them for duration seconds); returns samples, elapsed"""
+        plan = self.plan(requests or 10000)
+        samples = []
+        position = [0]
+        deadline = time.monotonic() + duration if duration else None
+
+        def next_step():
+            with self._lock:
+                if deadline is None and position[0] >= len(plan):
+                    return None
+                if deadline is not None and time.monotonic() >= deadline:
+                    return None
+                step = plan[position[0] % len(plan)]
+                index = position[0]
+                position[0] += 1
+                return index, step
+
+        def worker():
+            while True:
+                item = next_step()
+                if item is None:
+                    return
+                index, (operation, seed) = item
+                sample = self.execute(operation, random.Random(seed), index)
+                with self._lock:
+                    samples.append(sample)
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=worker) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return samples, time.monotonic() - started
+
+    def execute(self, operation, rng, index):
+        started = time.monotonic()
+        first_token = None
+        try:
+            if operation == 'upload':
+                ok, _ = self.upload(synthetic_resume(rng, f"{self.nonce}-{index}"))
+            elif operation == 'chat_stream':
+                ok, first_token = self.chat_stream(rng.choice(self.sessions), started)
+            else:
+                ok = self.post_json(operation, rng)
+        except Exception:
+            ok = False
+        sample = {'operation': operation, 'latency': time.monotonic() - started, 'ok': ok}
+        if first_token is not None:
+            sample['first_token'] = first_token
+        return sample
+
+    def upload(self, resume_text):
+        response = self.client().post('/upload', files={'file': ('resume.txt', resume_text.encode(), 'text/plain')})
+        data = response.json()
+        if response.status_code != 200 or not data.get('success'):
+            return False, data.get('error')
+        return True, data['session_id']
+
+    def post_json(self, operation, rng):
+        session_id = rng.choice(self.sessions)
+        if operation == 'chat':
+            path, body = '/chat', {'session_id': session_id, 'user_message': 'How can I improve my summary?'}
+        else:
+            path = '/' + operation.replace('_', '-')
+            body = {'session_id': session_id, 'job_role': rng.choice(JOB_ROLES)}
+        response = self.client().post(path, json=body)
+        return response.status_code == 200 and response.json().get('success', False)
+
+    def chat_stream(self, session_id, started):
+        body = {'session_id': session_id, 'user_message': 'What should I add?', 'stream': True}
+        first_token = None
+        ok = False
+        with self.client().stream('POST', '/chat', json=body) as response:
+            if response.status_code != 200:
+                return False, None
+            for line in response.iter_lines():
+                if line.startswith('event: token') and first_token is None:
+                    first_token = time.monotonic() - started
+                elif line.startswith('event: done'):
+                    ok = True
+                elif line.startswith('event: error'):
+                    ok = False
+        return ok, first_token
+
+
+def build_report(samples, elapsed, config):
+    operations = {}
+    for operation in OPERATIONS:
+        selected = [sample for sample in samples if sample['operation'] == operation]
+        if selected:
+            operations[operation] = summarize(selected, elapsed)
+    return {'config': config, 'elapsed_s': round(elapsed, 2), 'overall': summarize(samples, elapsed),
+            'operations': operations}
+
+
+def print_report(report):
+    header = f"{'operation':<20}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print('-' * len(header))
+    rows = list(report['operations'].items()) + [('overall', report['overall'])]
+    for name, summary in rows:
+        print(f"{name:<20}{summary['requests']:>9}{summary['errors']:>8}{summary['throughput']:>9.2f}"
+              f"{summary['p50_ms']:>10}{summary['p95_ms']:>10}{summary['p99_ms']:>10}")
+    for name, summary in report['operations'].items():
+        if 'ttft_p50_ms' in summary:
+            print(f"{name} time to first token: p50 {summary['ttft_p50_ms']} ms, p95 {summary['ttft_p95_ms']} ms")
+
+
+def compare(report, baseline, tolerance, max_error_increase=0.01):
+    """Regressions of report against baseline, as human-readable strings"""
+    regressions = []
+    pairs = [('overall', report['overall'], baseline['overall'])]
+    # Percentiles of small samples are mostly noise, so sparse operations only count overall
+    pairs += [(name, summary, baseline['operations'][name])
+              for name, summary in report['operations'].items()
+              if name in baseline.get('operations', {})
+              and min(summary['requests'], baseline['operations'][name]['requests']) >= MIN_COMPARE_SAMPLES]
+    for name, current, previous in pairs:
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if current.get(key) and previous.get(key) and current[key] > previous[key] * (1 + tolerance):
+                regressions.append(f"{name} {key}: {previous[key]} -> {current[key]}")
+        if current['error_rate'] > previous['error_rate'] + max_error_increase:
+            regressions.append(f"{name} error rate: {previous['error_rate']:.3f} -> {current['error_rate']:.3f}")
+    if report['overall']['throughput'] < baseline['overall']['throughput'] * (1 - tolerance):
+        regressions.append(
+            f"overall throughput: {baseline['overall']['throughput']:.2f} -> {report['overall']['throughput']:.2f} req/s"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test /upload, /chat and the generator endpoints.')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, default=16, help='simultaneous clients')
+    parser.add_argument('--requests', type=int, default=500, help='requests to send (ignored with --duration)')
+    parser.add_argument('--duration', type=float, default=None, help='run for this many seconds instead')
+    parser.add_argument('--warmup', type=int, default=20, help='requests sent first and left out of the results')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"operation weights (default: {DEFAULT_MIX})")
+    parser.add_argument('--sessions', type=int, default=20, help='sessions created up front for chat and generators')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=120.0, help='per-request timeout in seconds')
+    parser.add_argument('--output', help='write the results as JSON, e.g. to keep as a baseline')
+    parser.add_argument('--compare', help='baseline JSON from an earlier --output run')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='allowed relative slowdown before a metric counts as a regression (default: 0.15)')
+    args = parser.parse_args()
+
+    test = LoadTest(args.base_url, args.concurrency, parse_mix(args.mix), seed=args.seed,
+                    sessions=args.sessions, timeout=args.timeout)
+    print(f"Creating {args.sessions} sessions...", file=sys.stderr)
+    test.setup()
+    if args.warmup:
+        test.run(requests=args.warmup)
+    print(f"Running at concurrency {args.concurrency}...", file=sys.stderr)
+    samples, elapsed = test.run(requests=args.requests, duration=args.duration)
+
+    config = {key: getattr(args, key) for key in ('base_url', 'concurrency', 'requests', 'duration', 'mix', 'seed')}
+    report = build_report(samples, elapsed, config)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('config', {}).get('mix') != args.mix or baseline.get('config', {}).get('concurrency') != args.concurrency:
+            print("Warning: baseline was recorded with a different mix or concurrency", file=sys.stderr)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == '__main__':
+    main()
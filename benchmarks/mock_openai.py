@@ -0,0 +1,216 @@
+# Local stand-in for the OpenAI chat-completions endpoint, for load tests that
+# shouldn't spend API credits. Point the app at it with
+#   OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=mock
+# Latency, token rate, completion length and error injection are configurable;
+# with --seed the sequence of latencies and errors is reproducible.
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def parse_distribution(spec):
+    """Parse a latency spec into a sampler taking a Random
+
+    fixed:0.5            always 0.5s
+    uniform:0.2:1.5      uniformly between 0.2s and 1.5s
+    normal:0.8:0.2       mean 0.8s, standard deviation 0.2s (clipped at 0)
+    lognormal:0.8:0.5    median 0.8s, shape 0.5 (long right tail, like real APIs)
+    """
+    kind, *params = spec.split(':')
+    values = [float(value) for value in params]
+    if kind == 'fixed' and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == 'uniform' and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'normal' and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == 'lognormal' and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Invalid latency distribution: {spec}")
+
+
+class MockSettings:
+    def __init__(self, latency='lognormal:0.5:0.4', tokens_per_second=60.0, completion_tokens=200,
+                 error_rate=0.0, error_codes=(429, 500, 503), retry_after=1.0, seed=None):
+        self.sample_latency = parse_distribution(latency)
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.error_codes = list(error_codes)
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def plan(self, max_tokens):
+        """Decide latency, length and any injected error for one request"""
+        with self.lock:
+            self.requests += 1
+            latency = self.sample_latency(self.rng)
+            error = None
+            if self.error_rate and self.rng.random() < self.error_rate:
+                error = self.rng.choice(self.error_codes)
+                self.errors += 1
+        tokens = min(self.completion_tokens, max_tokens or self.completion_tokens)
+        return latency, tokens, error
+
+
+def count_prompt_tokens(messages):
+    return sum(len(str(message.get('content', ''))) for message in messages) // 4 + 4 * len(messages)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    settings = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self._send_json(200, {'object': 'list', 'data': [{'id': 'gpt-4o-mini', 'object': 'model'}]})
+        elif self.path == '/stats':
+            self._send_json(200, {'requests': self.settings.requests, 'errors': self.settings.errors})
+        else:
+            self._send_json(404, {'error': {'message': 'Not found'}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': 'Not found'}})
+            return
+
+        latency, tokens, error = self.settings.plan(body.get('max_tokens'))
+        time.sleep(latency)
+        if error:
+            headers = {'Retry-After': str(self.settings.retry_after)} if error == 429 else {}
+            self._send_json(error, {'error': {'message': f'Injected error {error}', 'type': 'mock_error'}}, headers)
+            return
+
+        model = body.get('model', 'gpt-4o-mini')
+        usage = {
+            'prompt_tokens': count_prompt_tokens(body.get('messages', [])),
+            'completion_tokens': tokens,
+            'total_tokens': count_prompt_tokens(body.get('messages', [])) + tokens
+        }
+        if body.get('stream'):
+            include_usage = (body.get('stream_options') or {}).get('include_usage')
+            self._stream(model, tokens, usage if include_usage else None)
+            return
+
+        # Generation time is spent before the whole answer goes out at once
+        time.sleep(tokens / self.settings.tokens_per_second)
+        self._send_json(200, {
+            'id': f"chatcmpl-{uuid.uuid4().hex}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': mock_text(tokens)},
+                'finish_reason': 'stop'
+            }],
+            'usage': usage
+        })
+
+    def _stream(self, model, tokens, usage):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        interval = 1.0 / self.settings.tokens_per_second
+        try:
+            for index in range(tokens):
+                self._chunk(completion_id, model, [{
+                    'index': 0,
+                    'delta': {'content': f"tok{index} "},
+                    'finish_reason': None
+                }])
+                time.sleep(interval)
+            self._chunk(completion_id, model, [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}])
+            if usage:
+                self._chunk(completion_id, model, [], usage)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
+
+    def _chunk(self, completion_id, model, choices, usage=None):
+        chunk = {
+            'id': completion_id,
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': model,
+            'choices': choices
+        }
+        if usage:
+            chunk['usage'] = usage
+        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        self.wfile.flush()
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def mock_text(tokens):
+    return ' '.join(f"tok{index}" for index in range(tokens))
+
+
+def make_server(host, port, settings):
+    handler = type('ConfiguredMockHandler', (MockHandler,), {'settings': settings})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock OpenAI chat-completions server for load testing.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--latency', default='lognormal:0.5:0.4',
+                        help='time to first token: fixed:S, uniform:A:B, normal:MEAN:SD or lognormal:MEDIAN:SHAPE')
+    parser.add_argument('--tokens-per-second', type=float, default=60.0, help='generation speed after the first token')
+    parser.add_argument('--completion-tokens', type=int, default=200,
+                        help='tokens per answer (capped by the request max_tokens)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests that fail (0-1)')
+    parser.add_argument('--error-codes', default='429,500,503', help='status codes to inject, chosen at random')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After seconds sent with injected 429s')
+    parser.add_argument('--seed', type=int, default=None, help='make latencies and injected errors reproducible')
+    args = parser.parse_args()
+
+    settings = MockSettings(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        error_codes=[int(code) for code in args.error_codes.split(',') if code],
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+    server = make_server(args.host, args.port, settings)
+    print(f"Mock OpenAI listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
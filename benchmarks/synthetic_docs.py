@@ -0,0 +1,144 @@
+# Seeded generators for synthetic resumes in the formats the app accepts.
+# The same arguments always produce the same bytes, so benchmark inputs are
+# identical from run to run without checking binary fixtures into the repo.
+import datetime
+import io
+import random
+import zipfile
+import zlib
+
+PDF_FONTS = {'helvetica': 'Helvetica', 'times': 'Times-Roman', 'courier': 'Courier'}
+DOCX_FONTS = {'helvetica': 'Arial', 'times': 'Times New Roman', 'courier': 'Courier New'}
+
+WORDS = (
+    'designed built led migrated optimized scaled automated reduced improved launched mentored '
+    'Python SQL Docker Kubernetes React AWS Spark Terraform Kafka PostgreSQL Redis GraphQL '
+    'platform pipeline service latency throughput reliability customers revenue team roadmap '
+    'analytics dashboard model training inference deployment monitoring incident security'
+).split()
+SECTIONS = ['Summary', 'Experience', 'Projects', 'Skills', 'Education', 'Certifications']
+
+
+def sentence(rng, words=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def resume_lines(rng, count):
+    """Section headings, bullet points and the odd contact line"""
+    lines = [f"Candidate {rng.randint(1000, 9999)} | candidate@example.com | +1 555 {rng.randint(1000, 9999)}"]
+    while len(lines) < count:
+        lines.append(rng.choice(SECTIONS))
+        for _ in range(rng.randint(3, 8)):
+            lines.append(f"- {sentence(rng, rng.randint(8, 16))}")
+    return lines[:count]
+
+
+def pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def make_pdf(pages=2, font='helvetica', lines_per_page=45, table_rows=0, compress=False, seed=0):
+    """A text-based PDF with the given page count, base font and optional table rows per page"""
+    rng = random.Random(seed)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = ' '.join(f"{3 + 2 * index} 0 R" for index in range(pages))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    font_id = 3 + 2 * pages
+
+    for _ in range(pages):
+        operations = ['BT', '/F1 10 Tf', '12 TL', '50 760 Td']
+        for line in resume_lines(rng, lines_per_page - table_rows):
+            operations.append(f"({pdf_escape(line[:95])}) '")
+        for row in range(table_rows):
+            # Table cells are positioned text runs on the same baseline
+            cells = [rng.choice(WORDS), str(rng.randint(2010, 2024)), rng.choice(WORDS), f"{rng.randint(1, 99)}%"]
+            operations.append("0 -12 Td")
+            for column, cell in enumerate(cells):
+                offset = 120 if column else 0
+                operations.append(f"{offset} 0 Td ({pdf_escape(cell)}) Tj")
+            operations.append(f"-{120 * (len(cells) - 1)} 0 Td")
+        operations.append('ET')
+        content = '\n'.join(operations).encode('latin-1')
+
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objects) + 2} 0 R "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>".encode()
+        )
+        if compress:
+            content = zlib.compress(content)
+            objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(content) + content + b"\nendstream")
+        else:
+            objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+    objects.append(f"<< /Type /Font /Subtype /Type1 /BaseFont /{PDF_FONTS[font]} >>".encode())
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def make_docx(pages=2, font='helvetica', paragraphs_per_page=30, tables=0, table_rows=6, header=True, seed=0):
+    """A DOCX resume with page breaks, an optional header/footer and skills tables"""
+    import docx
+    from docx.enum.text import WD_BREAK
+    from docx.shared import Pt
+
+    rng = random.Random(seed)
+    document = docx.Document()
+    style = document.styles['Normal']
+    style.font.name = DOCX_FONTS[font]
+    style.font.size = Pt(rng.choice([10, 10.5, 11, 12]))
+
+    if header:
+        section = document.sections[0]
+        section.header.paragraphs[0].text = f"Candidate {rng.randint(1000, 9999)} - Resume"
+        section.footer.paragraphs[0].text = "References available on request"
+
+    for page in range(pages):
+        for line in resume_lines(rng, paragraphs_per_page):
+            paragraph = document.add_paragraph()
+            run = paragraph.add_run(line)
+            run.bold = line in SECTIONS
+        for _ in range(tables):
+            table = document.add_table(rows=table_rows, cols=3)
+            for row in table.rows:
+                row.cells[0].text = rng.choice(WORDS)
+                row.cells[1].text = str(rng.randint(1, 10)) + ' years'
+                row.cells[2].text = sentence(rng, 6)
+        if page < pages - 1:
+            document.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
+
+    # Fixed timestamps, in the document properties and the zip entries, keep the bytes reproducible
+    fixed = datetime.datetime(2024, 1, 1)
+    document.core_properties.created = fixed
+    document.core_properties.modified = fixed
+    saved = io.BytesIO()
+    document.save(saved)
+
+    out = io.BytesIO()
+    with zipfile.ZipFile(saved) as source, zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            target.writestr(zipfile.ZipInfo(info.filename, date_time=fixed.timetuple()[:6]),
+                            source.read(info.filename), compress_type=zipfile.ZIP_DEFLATED)
+    return out.getvalue()
+
+
+def make_txt(size_bytes=16 * 1024, encoding='utf-8', seed=0):
+    """Plain-text resume of roughly size_bytes, encoded as given (utf-16 adds a BOM)"""
+    rng = random.Random(seed)
+    lines = []
+    length = 0
+    while length < size_bytes:
+        line = resume_lines(rng, 1)[0] if not lines else f"- {sentence(rng, rng.randint(8, 16))}"
+        if encoding == 'cp1252' and rng.random() < 0.1:
+            line += ' – résumé'
+        lines.append(line)
+        length += len(line) + 1
+    return '\n'.join(lines).encode(encoding)
@@ -0,0 +1,207 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from werkzeug.datastructures import FileStorage
+
+import extraction
+from extraction import extract_text_from_file
+from chat_context import count_tokens
+from llm_gateway import parse_route_limits
+
+
+def find_resumes(root, allowed_file):
+    """All resume files under root, as sorted paths relative to it"""
+    found = []
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if allowed_file(filename):
+                found.append(os.path.relpath(os.path.join(directory, filename), root))
+    return sorted(found)
+
+
+def load_checkpoint(output_path):
+    """Paths already processed successfully in a previous run of this output file"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A run interrupted mid-write leaves a partial last line
+                continue
+            if record.get('status') == 'ok':
+                done.add(record['path'])
+    return done
+
+
+def ends_with_newline(path):
+    """True if the file is empty or its last line is complete"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+def configure_llm_gateway(llm_concurrency):
+    """Size the app's LLM gateway for --llm-concurrency; must run before app is imported
+
+    Otherwise analyses past the app's own 'analysis' route limit queue inside the
+    gateway and fail with GatewayBusy once its queue timeout runs out.
+    """
+    limits = parse_route_limits(os.getenv('LLM_ROUTE_LIMITS'))
+    limits['analysis'] = llm_concurrency
+    os.environ['LLM_ROUTE_LIMITS'] = ','.join(f'{route}={limit}' for route, limit in limits.items())
+    max_in_flight = int(os.getenv('LLM_MAX_IN_FLIGHT', '16'))
+    os.environ['LLM_MAX_IN_FLIGHT'] = str(max(max_in_flight, llm_concurrency))
+
+
+def init_extraction_worker(use_sandbox):
+    extraction.EXTRACTION_SANDBOX = use_sandbox
+    # Files are already spread over --extract-workers; each needs one sandbox worker, not a pool
+    extraction.PDF_WORKERS = 1
+
+
+def extract_resume(root, path):
+    """Extract one resume; runs in a pool worker"""
+    with open(os.path.join(root, path), 'rb') as f:
+        return extract_text_from_file(FileStorage(stream=f, filename=os.path.basename(path)))
+
+
+class Progress:
+    """Periodic files/s and tokens/s readout on stderr"""
+
+    def __init__(self, total, interval=5.0):
+        self.total = total
+        self.interval = interval
+        self.started = time.monotonic()
+        self.last_report = self.started
+        self.files = 0
+        self.errors = 0
+        self.tokens = 0
+
+    def record(self, ok, tokens=0):
+        self.files += 1
+        self.tokens += tokens
+        if not ok:
+            self.errors += 1
+        now = time.monotonic()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report()
+
+    def report(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        print(
+            f"[{self.files}/{self.total}] {self.files / elapsed:.2f} files/s, "
+            f"{self.tokens / elapsed:.0f} tokens/s (est.), {self.errors} errors, {elapsed:.0f}s elapsed",
+            file=sys.stderr
+        )
+
+
+def run(root, output_path, extract_workers, llm_concurrency, use_sandbox, progress_interval):
+    # Imported here so extraction pool workers don't start the web app
+    configure_llm_gateway(llm_concurrency)
+    from app import allowed_file, analyze_resume_with_ai
+
+    paths = find_resumes(root, allowed_file)
+    done = load_checkpoint(output_path)
+    todo = [path for path in paths if path not in done]
+    print(f"{len(paths)} resumes found, {len(done)} already done, {len(todo)} to process", file=sys.stderr)
+    if not todo:
+        return
+
+    progress = Progress(len(todo), progress_interval)
+    # Keep a bounded number of files in flight so results never pile up in memory
+    window = 2 * (extract_workers + llm_concurrency)
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+    with open(output_path, 'a', encoding='utf-8') as out, \
+            ProcessPoolExecutor(max_workers=extract_workers,
+                                mp_context=multiprocessing.get_context(method),
+                                initializer=init_extraction_worker,
+                                initargs=(use_sandbox,)) as extract_pool, \
+            ThreadPoolExecutor(max_workers=llm_concurrency) as llm_pool:
+
+        # Make sure a partial line from an interrupted run doesn't swallow the next record
+        if not ends_with_newline(output_path):
+            out.write('\n')
+
+        def write(record):
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+
+        remaining = iter(todo)
+        extracting = {}
+        analyzing = {}
+        exhausted = False
+        while True:
+            while not exhausted and len(extracting) + len(analyzing) < window:
+                path = next(remaining, None)
+                if path is None:
+                    exhausted = True
+                    break
+                extracting[extract_pool.submit(extract_resume, root, path)] = path
+            if not extracting and not analyzing:
+                break
+
+            finished, _ = wait(list(extracting) + list(analyzing), return_when=FIRST_COMPLETED)
+            for future in finished:
+                if future in extracting:
+                    path = extracting.pop(future)
+                    try:
+                        resume_text = future.result()
+                    except Exception as e:
+                        resume_text = f"Error reading file: {str(e)}"
+                    if not resume_text or resume_text.startswith('Error'):
+                        write({'path': path, 'status': 'error', 'error': resume_text or 'No text found'})
+                        progress.record(ok=False)
+                        continue
+                    analyzing[llm_pool.submit(analyze_resume_with_ai, resume_text)] = (path, resume_text)
+                else:
+                    path, resume_text = analyzing.pop(future)
+                    analysis = future.result()
+                    if analysis.startswith('Error'):
+                        write({'path': path, 'status': 'error', 'error': analysis})
+                        progress.record(ok=False)
+                        continue
+                    write({'path': path, 'status': 'ok', 'resume_text': resume_text, 'analysis': analysis})
+                    progress.record(ok=True, tokens=count_tokens(resume_text) + count_tokens(analysis))
+
+    progress.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract and analyze a folder of resumes into a JSONL file.')
+    parser.add_argument('input_dir', help='folder to scan (recursively) for PDF, DOCX and TXT resumes')
+    parser.add_argument('output', help='JSONL file to append results to; also the checkpoint for resuming')
+    parser.add_argument('--extract-workers', type=int, default=os.cpu_count() or 1,
+                        help='processes used for text extraction (default: CPU count)')
+    parser.add_argument('--llm-concurrency', type=int, default=8,
+                        help='maximum analyses in flight at once (default: 8)')
+    parser.add_argument('--no-sandbox', action='store_true',
+                        help='parse documents directly in the pool workers (trusted input only)')
+    parser.add_argument('--progress-interval', type=float, default=5.0,
+                        help='seconds between progress lines (default: 5)')
+    args = parser.parse_args()
+
+    run(
+        args.input_dir,
+        args.output,
+        extract_workers=args.extract_workers,
+        llm_concurrency=args.llm_concurrency,
+        use_sandbox=not args.no_sandbox,
+        progress_interval=args.progress_interval
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import math
+import re
+
+# Words and individual punctuation marks, roughly how BPE tokenizers split text
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Fixed cost the chat format adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Room kept free for the running summary (about what SUMMARY_SYSTEM_PROMPT asks
+# for) and for the next question (the chat input is capped at 500 characters)
+SUMMARY_RESERVE_TOKENS = 300
+QUESTION_RESERVE_TOKENS = 200
+
+SUMMARY_SYSTEM_PROMPT = """You maintain a running summary of a resume coaching conversation. Merge the new exchanges into the existing summary. Keep the user's goals, details they shared about themselves and the concrete advice already given. Drop small talk. Write at most 200 words of plain prose."""
+
+
+def count_tokens(text):
+    """Estimate the token count of text locally, without a tokenizer download or network call"""
+    tokens = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        word = match.group()
+        # Long words are split into several sub-word tokens, about 4 characters each
+        tokens += max(1, math.ceil(len(word) / 4))
+    return tokens
+
+
+def message_tokens(message):
+    return count_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS
+
+
+def history_to_messages(chat_history):
+    """Convert stored chat history entries into chat completion messages"""
+    messages = []
+    for chat_msg in chat_history:
+        if chat_msg['type'] == 'user':
+            messages.append({"role": "user", "content": chat_msg['message']})
+        elif chat_msg['type'] == 'ai':
+            messages.append({"role": "assistant", "content": chat_msg['message']})
+    return messages
+
+
+def summary_message(summary):
+    return {"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}
+
+
+def build_context_messages(base_messages, summary, chat_history, user_message, budget):
+    """Fit the fixed context, running summary and as many recent turns as the budget allows"""
+    head = list(base_messages)
+    if summary:
+        head.append(summary_message(summary))
+    tail = {"role": "user", "content": user_message}
+
+    # The system prompt, resume and new question are always sent verbatim
+    remaining = budget - sum(message_tokens(m) for m in head) - message_tokens(tail)
+
+    recent = []
+    for message in reversed(history_to_messages(chat_history)):
+        cost = message_tokens(message)
+        if cost > remaining:
+            break
+        recent.append(message)
+        remaining -= cost
+    recent.reverse()
+
+    return head + recent + [tail]
+
+
+def turns_to_fold(base_messages, chat_history, budget, target_ratio=0.5):
+    """Number of oldest history entries to fold into the summary, 0 if history still fits
+
+    Once the history no longer fits, it is trimmed down to target_ratio of its
+    share of the budget so that summarization runs every few turns, not every turn.
+    """
+    fixed = sum(message_tokens(m) for m in base_messages)
+    history_budget = budget - fixed - SUMMARY_RESERVE_TOKENS - QUESTION_RESERVE_TOKENS
+
+    costs = [message_tokens(m) for m in history_to_messages(chat_history)]
+    total = sum(costs)
+    if total <= history_budget:
+        return 0
+
+    target = max(0, history_budget * target_ratio)
+    folded = 0
+    while folded < len(chat_history) and total > target:
+        total -= costs[folded]
+        folded += 1
+    # Fold whole exchanges so a question is never separated from its answer
+    if folded % 2 and folded < len(chat_history):
+        folded += 1
+    return folded
+
+
+def build_summary_messages(summary, entries):
+    """Messages asking the model to merge entries into the running summary"""
+    exchanges = "\n".join(
+        f"{'User' if entry['type'] == 'user' else 'Coach'}: {entry['message']}"
+        for entry in entries
+    )
+    return [
+        {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Current summary:\n{summary or '(none yet)'}\n\nNew exchanges:\n{exchanges}"}
+    ]
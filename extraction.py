@@ -0,0 +1,505 @@
+import codecs
+import io
+import logging
+import math
+import mmap
+import multiprocessing
+import multiprocessing.util
+import os
+import re
+import threading
+import tempfile
+import time
+import zipfile
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from xml.etree import ElementTree
+
+import PyPDF2
+
+from extraction_sandbox import (
+    FORMAT_LABELS, SANDBOX_CPU_SECONDS, SANDBOX_MEMORY_BYTES, SANDBOX_WALL_SECONDS, apply_limits, run_limited
+)
+from metrics import PHASE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# PDF extraction budgets. Pages past PDF_MAX_PAGES are ignored, extraction stops
+# with whatever text it has after PDF_TIME_BUDGET seconds, and if PDF_ENOUGH_CHARS
+# is set it stops early once that much text has been gathered.
+PDF_MAX_PAGES = int(os.getenv('PDF_MAX_PAGES', '50'))
+PDF_TIME_BUDGET = float(os.getenv('PDF_TIME_BUDGET', '10'))
+PDF_ENOUGH_CHARS = int(os.getenv('PDF_ENOUGH_CHARS', '0'))
+
+# Uploads larger than this are rejected before any parsing
+EXTRACTION_MAX_BYTES = int(os.getenv('EXTRACTION_MAX_BYTES', str(10 * 1024 * 1024)))
+
+# Text that is not plain ASCII is decoded in chunks of this size
+TEXT_DECODE_CHUNK = 64 * 1024
+
+# Byte order marks, longest first (the UTF-32 LE mark starts with the UTF-16 LE one)
+TEXT_BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# DOCX files are zip archives; refuse ones that would inflate past this (zip bombs)
+DOCX_MAX_UNCOMPRESSED_BYTES = int(os.getenv('DOCX_MAX_UNCOMPRESSED_BYTES', str(50 * 1024 * 1024)))
+
+# PDF and DOCX parsing runs on resource-limited pool workers (see extraction_sandbox.py)
+EXTRACTION_SANDBOX = os.getenv('EXTRACTION_SANDBOX', '1') == '1'
+
+# Size of the extraction process pool; documents with at least PDF_PARALLEL_MIN_PAGES
+# pages are split across it. The same pool runs sandboxed extractions.
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '8'))
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+_pool = None
+_pool_shutdown = None
+_pool_lock = threading.Lock()
+# Set in pool workers, which leave splitting documents to the parent
+_in_worker = False
+
+
+def init_pool_worker(sandbox):
+    global _in_worker
+    _in_worker = True
+    if sandbox:
+        apply_limits(SANDBOX_CPU_SECONDS, SANDBOX_MEMORY_BYTES)
+
+
+def get_extraction_pool():
+    """Lazily start the shared process pool for sandboxed extraction and PDF pages"""
+    global _pool, _pool_shutdown
+    with _pool_lock:
+        if _pool is None:
+            # forkserver avoids forking the threaded web server process itself
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _pool = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context(method),
+                initializer=init_pool_worker,
+                initargs=(EXTRACTION_SANDBOX,)
+            )
+            # Runs before multiprocessing joins child processes (and closes queues) at exit;
+            # without it a process that is itself a pool worker (bulk_ingest.py) never exits
+            _pool_shutdown = multiprocessing.util.Finalize(
+                _pool, _pool.shutdown, kwargs={'cancel_futures': True}, exitpriority=100
+            )
+        return _pool
+
+
+def reset_extraction_pool():
+    """Drop a broken or stuck pool so the next document starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool_shutdown.cancel()
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def submit_extraction(fn, *args):
+    """Run fn(*args) on the extraction pool, under a fresh CPU budget when sandboxed"""
+    if EXTRACTION_SANDBOX:
+        return get_extraction_pool().submit(run_limited, fn, *args)
+    return get_extraction_pool().submit(fn, *args)
+
+
+def extract_pdf_page_range(pdf_bytes, start, stop):
+    """Extract pages [start, stop) of a PDF; runs inside a pool worker"""
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    return [(pdf_reader.pages[index].extract_text() or '') for index in range(start, stop)]
+
+
+def extract_text_from_pdf(file_stream, max_pages=None, time_budget=None, enough_chars=None):
+    """Extract text from PDF file"""
+    max_pages = PDF_MAX_PAGES if max_pages is None else max_pages
+    time_budget = PDF_TIME_BUDGET if time_budget is None else time_budget
+    enough_chars = PDF_ENOUGH_CHARS if enough_chars is None else enough_chars
+    try:
+        pdf_reader = PyPDF2.PdfReader(file_stream)
+        page_count = min(len(pdf_reader.pages), max_pages)
+        deadline = time.monotonic() + time_budget
+
+        pages = None
+        if page_count >= PDF_PARALLEL_MIN_PAGES and PDF_WORKERS > 1 and not _in_worker:
+            # Pool workers each need their own copy of the document
+            file_stream.seek(0)
+            pdf_bytes = file_stream.read()
+            try:
+                pages = _extract_pages_parallel(pdf_bytes, page_count, deadline, enough_chars)
+            except BrokenProcessPool:
+                reset_extraction_pool()
+        if pages is None:
+            pages = _extract_pages_sequential(pdf_reader, page_count, deadline, enough_chars)
+        if page_count and not pages:
+            return "Error reading PDF: extraction time limit reached before any page was read"
+
+        # Join once at the end instead of growing a string page by page
+        return "\n".join(pages).strip()
+    except Exception as e:
+        return f"Error reading PDF: {str(e)}"
+
+
+def _extract_pages_sequential(pdf_reader, page_count, deadline, enough_chars):
+    pages = []
+    gathered = 0
+    for index in range(page_count):
+        if pages and time.monotonic() > deadline:
+            break
+        text = pdf_reader.pages[index].extract_text() or ''
+        pages.append(text)
+        gathered += len(text)
+        if enough_chars and gathered >= enough_chars:
+            break
+    return pages
+
+
+def _extract_pages_parallel(pdf_bytes, page_count, deadline, enough_chars):
+    """Extract page chunks on the process pool, keeping them in document order"""
+    # A couple of chunks per worker keeps them busy without re-parsing the file too often
+    chunk_size = max(1, math.ceil(page_count / (PDF_WORKERS * 2)))
+    futures = [
+        submit_extraction(extract_pdf_page_range, pdf_bytes, start, min(start + chunk_size, page_count))
+        for start in range(0, page_count, chunk_size)
+    ]
+
+    pages = []
+    gathered = 0
+    try:
+        for future in futures:
+            try:
+                chunk = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeout:
+                # Out of time: keep the leading pages we already have
+                break
+            pages.extend(chunk)
+            gathered += sum(len(text) for text in chunk)
+            if enough_chars and gathered >= enough_chars:
+                break
+    finally:
+        for future in futures:
+            future.cancel()
+    return pages
+
+
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+
+
+def iter_docx_lines(xml_stream):
+    """Yield text lines from a WordprocessingML part in reading order, without building a DOM
+
+    Paragraphs become lines, table rows become "cell | cell" lines and text boxes
+    are emitted where they are anchored.
+    """
+    paragraphs = []   # text pieces of the open paragraphs (text boxes nest them)
+    cells = []        # paragraph texts of the open table cells
+    rows = []         # cell texts of the open table rows
+    fallback_depth = 0
+
+    for event, elem in ElementTree.iterparse(xml_stream, events=('start', 'end')):
+        tag = elem.tag
+        if tag == MC_FALLBACK:
+            # Alternate content repeats the preferred markup (e.g. text boxes); skip the copy
+            fallback_depth += 1 if event == 'start' else -1
+            continue
+        if fallback_depth:
+            if event == 'end':
+                elem.clear()
+            continue
+
+        if event == 'start':
+            if tag == WORD_NS + 'p':
+                paragraphs.append([])
+            elif tag == WORD_NS + 'tc':
+                cells.append([])
+            elif tag == WORD_NS + 'tr':
+                rows.append([])
+            continue
+
+        if tag == WORD_NS + 't':
+            if paragraphs:
+                paragraphs[-1].append(elem.text or '')
+        elif tag == WORD_NS + 'tab':
+            if paragraphs:
+                paragraphs[-1].append('\t')
+        elif tag in (WORD_NS + 'br', WORD_NS + 'cr'):
+            if paragraphs:
+                paragraphs[-1].append('\n')
+        elif tag == WORD_NS + 'p':
+            text = ''.join(paragraphs.pop())
+            if cells and not paragraphs:
+                cells[-1].append(text)
+            elif text.strip():
+                yield text
+        elif tag == WORD_NS + 'tc':
+            rows[-1].append(' '.join(text.strip() for text in cells.pop() if text.strip()))
+        elif tag == WORD_NS + 'tr':
+            line = ' | '.join(cell for cell in rows.pop() if cell)
+            if cells:
+                # Nested table: its rows belong to the enclosing cell
+                cells[-1].append(line)
+            elif line:
+                yield line
+        else:
+            continue
+        elem.clear()
+
+
+def extract_text_from_docx(file_stream):
+    """Extract text from DOCX file, including tables, text boxes, headers and footers"""
+    try:
+        with zipfile.ZipFile(file_stream) as archive:
+            names = archive.namelist()
+            headers = sorted(name for name in names if re.fullmatch(r'word/header\d*\.xml', name))
+            footers = sorted(name for name in names if re.fullmatch(r'word/footer\d*\.xml', name))
+
+            lines = []
+            seen_blocks = set()
+            for part in headers + ['word/document.xml'] + footers:
+                with archive.open(part) as xml_stream:
+                    block = list(iter_docx_lines(xml_stream))
+                # First-page, even and default headers often repeat the same text
+                key = '\n'.join(block)
+                if part != 'word/document.xml':
+                    if key in seen_blocks:
+                        continue
+                    seen_blocks.add(key)
+                lines.extend(block)
+        return '\n'.join(lines).strip()
+    except Exception as e:
+        return f"Error reading DOCX: {str(e)}"
+
+
+@contextmanager
+def upload_buffer(stream, limit):
+    """Expose up to limit + 1 bytes of an upload, memory-mapping uploads spooled to disk"""
+    raw = stream._file if isinstance(stream, tempfile.SpooledTemporaryFile) else stream
+    try:
+        fileno = raw.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        fileno = None
+
+    if fileno is None or os.fstat(fileno).st_size == 0:
+        # Small uploads stay in memory, below the spool threshold
+        stream.seek(0)
+        yield stream.read(limit + 1)
+        return
+
+    raw.flush()
+    with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as data:
+        yield data
+
+
+class MappedFile(io.RawIOBase):
+    """Seekable, read-only file object over a memory map, with its own position"""
+
+    def __init__(self, data):
+        self._data = data
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunk = self._data[self._pos:self._pos + len(buffer)]
+        buffer[:len(chunk)] = chunk
+        self._pos += len(chunk)
+        return len(chunk)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._data)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+
+def as_file(data):
+    """File-like view of upload data for parsers that want a stream"""
+    if isinstance(data, mmap.mmap):
+        return MappedFile(data)
+    return io.BytesIO(data)
+
+
+def decode_text(data):
+    """Decode a text upload, honouring BOMs and falling back from UTF-8 to cp1252
+
+    Works on a view of the buffer (bytes or a memory map). ASCII text, the usual
+    case, is decoded in one go, so the result string is the only copy made.
+    """
+    # Released on return, so a memory map can be closed afterwards
+    with memoryview(data) as view:
+        for bom, encoding in TEXT_BOMS:
+            if data[:len(bom)] == bom:
+                return ''.join(_decode_incrementally(view, encoding))
+
+        ascii_end = _ascii_prefix_length(view)
+        if ascii_end == len(view):
+            return str(view, 'ascii')
+        # The leading ASCII text reads the same in UTF-8 and cp1252, so it is decoded once
+        parts = [str(view[:ascii_end], 'ascii')]
+        try:
+            parts.extend(_decode_incrementally(view[ascii_end:], 'utf-8'))
+        except UnicodeDecodeError:
+            # Most non-UTF-8 resumes come from Windows editors
+            del parts[1:]
+            parts.extend(_decode_incrementally(view[ascii_end:], 'cp1252', errors='replace'))
+        return ''.join(parts)
+
+
+def _ascii_prefix_length(view):
+    """Length of the leading run of whole TEXT_DECODE_CHUNK chunks that are pure ASCII"""
+    for start in range(0, len(view), TEXT_DECODE_CHUNK):
+        if not view[start:start + TEXT_DECODE_CHUNK].tobytes().isascii():
+            return start
+    return len(view)
+
+
+def _decode_incrementally(view, encoding, errors='strict'):
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    parts = [
+        decoder.decode(view[start:start + TEXT_DECODE_CHUNK])
+        for start in range(0, len(view), TEXT_DECODE_CHUNK)
+    ]
+    parts.append(decoder.decode(b'', final=True))
+    return parts
+
+
+def detect_format(data):
+    """Identify an upload from its magic bytes: 'pdf', 'docx', 'txt' or None"""
+    # PDF readers accept the header anywhere in the first kilobyte
+    if b'%PDF-' in data[:1024]:
+        return 'pdf'
+    if data[:4] == b'PK\x03\x04':
+        try:
+            with zipfile.ZipFile(as_file(data)) as archive:
+                if 'word/document.xml' in archive.namelist():
+                    return 'docx'
+        except zipfile.BadZipFile:
+            pass
+        return None
+    # UTF-16/32 text is full of NUL bytes, but starts with a byte order mark
+    if any(data[:len(bom)] == bom for bom, _ in TEXT_BOMS):
+        return 'txt'
+    # Text files have no NUL bytes; binary formats almost always do early on
+    if b'\x00' not in data[:8192]:
+        return 'txt'
+    return None
+
+
+def precheck_document(kind, data):
+    """Cheap structural checks that reject hopeless files before full parsing"""
+    if kind == 'pdf':
+        # Fonts may hide inside compressed object streams, so only judge PDFs without them
+        if data.find(b'/Font') == -1 and data.find(b'/ObjStm') == -1 and data.find(b'/Image') != -1:
+            return "Error reading PDF: the file only contains images (a scan?); please upload a text-based PDF"
+    elif kind == 'docx':
+        try:
+            with zipfile.ZipFile(as_file(data)) as archive:
+                inflated = sum(info.file_size for info in archive.infolist())
+        except zipfile.BadZipFile as e:
+            return f"Error reading DOCX: {str(e)}"
+        if inflated > DOCX_MAX_UNCOMPRESSED_BYTES:
+            return "Error reading DOCX: the file expands to more data than allowed"
+    return None
+
+
+def extract_text_from_bytes(kind, data):
+    """Extract text from an upload whose format is already known"""
+    if kind == 'pdf':
+        return extract_text_from_pdf(as_file(data))
+    elif kind == 'docx':
+        return extract_text_from_docx(as_file(data))
+    elif kind == 'txt':
+        return decode_text(data)
+    else:
+        return "Error reading file: unsupported or unrecognized format"
+
+
+def extract_text_from_file(file):
+    """Extract text from uploaded file based on its content"""
+    started = time.perf_counter()
+    with PHASE_SECONDS.time('extraction'):
+        text = _extract_text_from_file(file)
+    failed = not text or text.startswith('Error')
+    logger.log(logging.WARNING if failed else logging.INFO, 'extraction', extra={
+        'chars': 0 if failed else len(text),
+        'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+        'error': text[:200] if failed and text else None
+    })
+    return text
+
+
+def _extract_text_from_file(file):
+    with upload_buffer(file.stream, EXTRACTION_MAX_BYTES) as data:
+        if len(data) > EXTRACTION_MAX_BYTES:
+            return f"Error reading file: larger than the {EXTRACTION_MAX_BYTES // (1024 * 1024)} MB limit"
+
+        # Trust the bytes, not the filename
+        kind = detect_format(data)
+        if kind is None:
+            return "Error reading file: unsupported or unrecognized format"
+
+        problem = precheck_document(kind, data)
+        if problem:
+            return problem
+
+        if kind != 'txt' and EXTRACTION_SANDBOX:
+            return extract_sandboxed(kind, data)
+        return extract_text_from_bytes(kind, data)
+
+
+def extract_in_worker(kind, data, split_pages):
+    """Runs on a pool worker: the text, or only the page count of a PDF the parent should split"""
+    if kind == 'pdf' and split_pages:
+        try:
+            page_count = min(len(PyPDF2.PdfReader(io.BytesIO(data)).pages), PDF_MAX_PAGES)
+        except Exception:
+            page_count = 0
+        if page_count >= PDF_PARALLEL_MIN_PAGES:
+            return page_count
+    return extract_text_from_bytes(kind, data)
+
+
+def extract_sandboxed(kind, data):
+    """Extract on the resource-limited pool, so a hostile document only ever hits a worker"""
+    label = FORMAT_LABELS.get(kind, kind.upper())
+    started = time.monotonic()
+    try:
+        # Workers get their own copy of the upload
+        data = bytes(data)
+        result = submit_extraction(extract_in_worker, kind, data, PDF_WORKERS > 1).result(timeout=SANDBOX_WALL_SECONDS)
+        if not isinstance(result, int):
+            return result
+
+        # A long PDF: spread its pages over the pool within what is left of both budgets
+        deadline = started + min(SANDBOX_WALL_SECONDS, PDF_TIME_BUDGET)
+        pages = _extract_pages_parallel(data, result, deadline, PDF_ENOUGH_CHARS)
+        if not pages:
+            return "Error reading PDF: extraction time limit reached before any page was read"
+        return "\n".join(pages).strip()
+    except FutureTimeout:
+        # The stuck worker is killed by its CPU limit; don't queue new documents behind it
+        reset_extraction_pool()
+        return f"Error reading {label}: the file took too long to process"
+    except BrokenProcessPool:
+        logger.warning('Extraction worker died; restarting the pool', extra={'kind': kind})
+        reset_extraction_pool()
+        return f"Error reading {label}: the file is too large or complex to process"
+    except Exception as e:
+        return f"Error reading {label}: {str(e)}"
+
@@ -0,0 +1,46 @@
+# Resource limits for the extraction worker pool (see get_extraction_pool in extraction.py).
+# Workers are long-lived: each gets an address-space cap when it starts and a fresh
+# CPU budget before every task, so a malformed or malicious document can at worst
+# exhaust one worker's limits, and the pool is restarted after the kernel kills it.
+import math
+import os
+
+# Per-extraction limits for the worker processes
+SANDBOX_CPU_SECONDS = int(os.getenv('EXTRACTION_CPU_SECONDS', '10'))
+SANDBOX_MEMORY_BYTES = int(os.getenv('EXTRACTION_MEMORY_BYTES', str(512 * 1024 * 1024)))
+SANDBOX_WALL_SECONDS = float(os.getenv('EXTRACTION_WALL_SECONDS', '15'))
+
+FORMAT_LABELS = {'pdf': 'PDF', 'docx': 'DOCX'}
+
+
+def apply_limits(cpu_seconds, memory_bytes):
+    """Cap CPU time from now on and address space for this process, where the platform supports it"""
+    try:
+        import resource
+    except ImportError:
+        return
+    set_cpu_budget(cpu_seconds)
+    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+
+
+def set_cpu_budget(cpu_seconds):
+    """Let this process use cpu_seconds more CPU time before the kernel kills it with SIGXCPU
+
+    Only the soft limit moves, so a reused worker can be given a new budget per task.
+    """
+    try:
+        import resource
+    except ImportError:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = math.ceil(usage.ru_utime + usage.ru_stime) + cpu_seconds
+    hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def run_limited(fn, *args):
+    """Run fn(*args) in a sandbox worker with a fresh CPU budget"""
+    set_cpu_budget(SANDBOX_CPU_SECONDS)
+    return fn(*args)
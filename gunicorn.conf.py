@@ -0,0 +1,53 @@
+# Production server settings, picked up automatically by `gunicorn wsgi:app`.
+# Requests spend most of their time waiting on the LLM, so each worker runs many
+# threads. Sessions, the analysis cache's memory tier and upload jobs live in
+# process memory, so with more than one worker a session only exists in the
+# worker that created it; keep WEB_WORKERS=1 unless requests are pinned to workers.
+import os
+import signal
+import threading
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5000')}"
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_WORKERS', '1'))
+threads = int(os.getenv('WEB_THREADS', '32'))
+
+# A worker that stops heartbeating for this long is restarted. Threaded workers
+# heartbeat independently of requests, so slow LLM calls don't trip it.
+timeout = int(os.getenv('WEB_TIMEOUT', '120'))
+# How long in-flight requests (including streamed responses) get to finish on shutdown
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('WEB_KEEPALIVE', '5'))
+# After SIGTERM, keep serving with /readyz at 503 this long so load balancers notice
+# and stop routing here; it counts against graceful_timeout
+shutdown_drain = float(os.getenv('WEB_SHUTDOWN_DRAIN', '5'))
+
+# Recycle workers now and then to bound memory growth; 0 disables it
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+
+# The app starts background threads (session sweeper, executors) at import time,
+# which would not survive a fork, so each worker imports it itself
+preload_app = False
+
+# The app already logs one JSON "request" record per request through its background
+# log queue; gunicorn's access log would write a second, plaintext line synchronously.
+# Set WEB_ACCESS_LOG to a path (or - for stdout) to turn it back on anyway
+accesslog = os.getenv('WEB_ACCESS_LOG') or None
+errorlog = '-'
+
+
+def post_worker_init(worker):
+    """Report not-ready as soon as the worker is asked to stop, then shut down after the drain period"""
+    from app import begin_shutdown
+
+    handle_exit = worker.handle_exit
+
+    def on_term(sig, frame):
+        begin_shutdown()
+        # Not slept here: the handler runs on the thread that accepts connections
+        timer = threading.Timer(shutdown_drain, handle_exit, args=(sig, frame))
+        timer.daemon = True
+        timer.start()
+
+    signal.signal(signal.SIGTERM, on_term)
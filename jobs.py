@@ -0,0 +1,99 @@
+import contextvars
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFull(Exception):
+    """Raised when the job queue has no room for another job"""
+
+
+class JobQueue:
+    """Bounded background worker pool with pollable job status"""
+
+    def __init__(self, max_workers=4, max_queued=32, result_ttl=600):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        # One slot per running or waiting job, so the backlog can never grow unbounded
+        self._slots = threading.BoundedSemaphore(max_workers + max_queued)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) and return its job id, or raise QueueFull"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise QueueFull('Job queue is full')
+
+        job_id = str(uuid.uuid4())
+        job = {
+            'status': 'queued',
+            'result': None,
+            'error': None,
+            'created': time.time(),
+            'started': None,
+            'finished': None
+        }
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = job
+            self.submitted += 1
+
+        try:
+            # Copy the submitter's context so the job logs under the ID of the request that queued it
+            self._executor.submit(contextvars.copy_context().run, self._run, job, fn, args, kwargs)
+        except Exception:
+            self._slots.release()
+            with self._lock:
+                del self._jobs[job_id]
+            raise
+        return job_id
+
+    def get(self, job_id):
+        """Return a snapshot of the job, or None if it is unknown or expired"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def stats(self):
+        """Queue depth and worker counters"""
+        with self._lock:
+            queued = sum(1 for job in self._jobs.values() if job['status'] == 'queued')
+            running = sum(1 for job in self._jobs.values() if job['status'] == 'running')
+            return {
+                'queued': queued,
+                'running': running,
+                'max_workers': self.max_workers,
+                'max_queued': self.max_queued,
+                'submitted': self.submitted,
+                'rejected': self.rejected
+            }
+
+    def _run(self, job, fn, args, kwargs):
+        job['started'] = time.time()
+        job['status'] = 'running'
+        try:
+            job['result'] = fn(*args, **kwargs)
+            job['status'] = 'done'
+        except Exception as e:
+            job['error'] = str(e)
+            job['status'] = 'failed'
+        finally:
+            job['finished'] = time.time()
+            self._slots.release()
+
+    def _prune(self):
+        """Forget finished jobs older than result_ttl (caller holds the lock)"""
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job['finished'] is not None and job['finished'] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
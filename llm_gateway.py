@@ -0,0 +1,431 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from contextlib import AsyncExitStack, ExitStack, asynccontextmanager, contextmanager
+
+import httpx
+import openai
+
+from metrics import LLM_QUEUE_SECONDS, LLM_SECONDS, LLM_TOKENS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# Errors worth retrying: rate limits, provider-side failures and dropped connections
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APIConnectionError,
+)
+
+
+class GatewayBusy(Exception):
+    """Raised when no concurrency slot frees up within the queue timeout"""
+
+
+def parse_route_limits(spec):
+    """Parse "chat=8,analysis=4" into {'chat': 8, 'analysis': 4}"""
+    limits = {}
+    for item in (spec or '').split(','):
+        if '=' in item:
+            route, limit = item.split('=', 1)
+            limits[route.strip()] = int(limit)
+    return limits
+
+
+class LLMGateway:
+    """Single entry point for chat completions with pooling, retries and concurrency caps"""
+
+    def __init__(self, api_key, base_url=None, timeout=30.0, max_retries=3,
+                 backoff_base=0.5, backoff_max=8.0, max_connections=32,
+                 max_keepalive_connections=16, keepalive_expiry=60.0,
+                 max_in_flight=16, route_limits=None, queue_timeout=30.0, stream_usage=True):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.queue_timeout = queue_timeout
+        self.max_in_flight = max_in_flight
+        self.route_limits = dict(route_limits or {})
+        # Ask for a final usage chunk on streams; some compatible endpoints reject stream_options
+        self.stream_usage = stream_usage
+
+        self._global_slots = threading.BoundedSemaphore(max_in_flight)
+        self._route_slots = {
+            route: threading.BoundedSemaphore(limit)
+            for route, limit in self.route_limits.items()
+        }
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+
+        # Created on first use by the async methods, inside the event loop
+        self._async_settings = {
+            'api_key': api_key,
+            'base_url': base_url,
+            'timeout': timeout,
+            'limits': httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry
+            )
+        }
+        self.async_client = None
+
+        try:
+            # One shared, keep-alive connection pool for every route; retries are
+            # handled here so the SDK's own retry loop is switched off
+            self.http_client = httpx.Client(
+                timeout=timeout,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_keepalive_connections,
+                    keepalive_expiry=keepalive_expiry
+                )
+            )
+            self.client = openai.OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=timeout,
+                max_retries=0,
+                http_client=self.http_client
+            )
+        except Exception as e:
+            logger.error('OpenAI client initialization error: %s', e)
+            # Fallback to older API style if needed
+            openai.api_key = api_key
+            self.client = None
+
+    def complete(self, route, messages, max_tokens, temperature=0.7, model=DEFAULT_MODEL):
+        """Return the full completion text for messages"""
+        attempt = 0
+        while True:
+            try:
+                with self._slot(route):
+                    started = time.perf_counter()
+                    try:
+                        response = self._create(messages, max_tokens, temperature, model, stream=False)
+                    except Exception:
+                        self._finish_call(route, started, 'error')
+                        raise
+                    self._finish_call(route, started, 'ok', getattr(response, 'usage', None))
+                return response.choices[0].message.content
+            except RETRYABLE_ERRORS as e:
+                attempt = self._backoff_or_raise(e, attempt)
+            except Exception:
+                self._count('failures')
+                raise
+
+    def stream(self, route, messages, max_tokens, temperature=0.7, model=DEFAULT_MODEL):
+        """Yield the completion piece by piece, holding a concurrency slot until done"""
+        if not self.client:
+            with self._slot(route):
+                # Older API has no streaming support here, send everything at once
+                response = self._create(messages, max_tokens, temperature, model, stream=False)
+                yield response.choices[0].message.content
+            return
+
+        # Retries are only safe until the first piece has been sent on. Like complete(),
+        # each attempt takes its own slot, so nobody waits on us while we back off
+        attempt = 0
+        while True:
+            slot = ExitStack()
+            slot.enter_context(self._slot(route))
+            started = time.perf_counter()
+            try:
+                stream = self._create(messages, max_tokens, temperature, model, stream=True)
+                break
+            except RETRYABLE_ERRORS as e:
+                self._finish_call(route, started, 'error')
+                slot.close()
+                attempt = self._backoff_or_raise(e, attempt)
+            except Exception:
+                self._finish_call(route, started, 'error')
+                slot.close()
+                self._count('failures')
+                raise
+
+        with slot:
+            # The client may hang up mid-stream, which closes this generator early
+            outcome = 'cancelled'
+            usage = None
+            try:
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+                    usage = getattr(chunk, 'usage', None) or usage
+                outcome = 'ok'
+            except Exception:
+                outcome = 'error'
+                self._count('failures')
+                raise
+            finally:
+                stream.close()
+                self._finish_call(route, started, outcome, usage)
+
+    async def acomplete(self, route, messages, max_tokens, temperature=0.7, model=DEFAULT_MODEL):
+        """Async version of complete(); waits without holding a thread"""
+        if not self.client:
+            return await asyncio.to_thread(self.complete, route, messages, max_tokens, temperature, model)
+        attempt = 0
+        while True:
+            try:
+                async with self._async_slot(route):
+                    started = time.perf_counter()
+                    try:
+                        response = await self._acreate(messages, max_tokens, temperature, model, stream=False)
+                    except Exception:
+                        self._finish_call(route, started, 'error')
+                        raise
+                    self._finish_call(route, started, 'ok', response.usage)
+                return response.choices[0].message.content
+            except RETRYABLE_ERRORS as e:
+                delay = self._retry_delay(e, attempt)
+                attempt += 1
+                await asyncio.sleep(delay)
+            except Exception:
+                self._count('failures')
+                raise
+
+    async def astream(self, route, messages, max_tokens, temperature=0.7, model=DEFAULT_MODEL):
+        """Async version of stream()"""
+        if not self.client:
+            yield await self.acomplete(route, messages, max_tokens, temperature, model)
+            return
+
+        attempt = 0
+        while True:
+            slot = AsyncExitStack()
+            await slot.enter_async_context(self._async_slot(route))
+            started = time.perf_counter()
+            try:
+                stream = await self._acreate(messages, max_tokens, temperature, model, stream=True)
+                break
+            except RETRYABLE_ERRORS as e:
+                self._finish_call(route, started, 'error')
+                await slot.aclose()
+                delay = self._retry_delay(e, attempt)
+                attempt += 1
+                await asyncio.sleep(delay)
+            except Exception:
+                self._finish_call(route, started, 'error')
+                await slot.aclose()
+                self._count('failures')
+                raise
+            except BaseException:
+                # Cancelled while connecting
+                await slot.aclose()
+                raise
+
+        async with slot:
+            outcome = 'cancelled'
+            usage = None
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+                    usage = chunk.usage or usage
+                outcome = 'ok'
+            except Exception:
+                outcome = 'error'
+                self._count('failures')
+                raise
+            finally:
+                await stream.close()
+                self._finish_call(route, started, outcome, usage)
+
+    async def aclose(self):
+        if self.async_client is not None:
+            await self.async_client.close()
+            self.async_client = None
+
+    def stats(self):
+        """In-flight counts per route and retry/failure counters"""
+        with self._lock:
+            return {
+                'in_flight': sum(self._in_flight.values()),
+                'in_flight_by_route': dict(self._in_flight),
+                'max_in_flight': self.max_in_flight,
+                'route_limits': dict(self.route_limits),
+                'requests': self.requests,
+                'retries': self.retries,
+                'failures': self.failures,
+                'rejected': self.rejected
+            }
+
+    def _create(self, messages, max_tokens, temperature, model, stream):
+        self._count('requests')
+        if self.client:
+            return self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=stream,
+                **self._stream_options(stream)
+            )
+        # Fallback to older API
+        return openai.ChatCompletion.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+
+    async def _acreate(self, messages, max_tokens, temperature, model, stream):
+        if self.async_client is None:
+            settings = self._async_settings
+            self.async_client = openai.AsyncOpenAI(
+                api_key=settings['api_key'],
+                base_url=settings['base_url'],
+                timeout=settings['timeout'],
+                max_retries=0,
+                http_client=httpx.AsyncClient(timeout=settings['timeout'], limits=settings['limits'])
+            )
+        self._count('requests')
+        return await self.async_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=stream,
+            **self._stream_options(stream)
+        )
+
+    def _stream_options(self, stream):
+        # Streams only report token usage in a final chunk when asked to
+        if stream and self.stream_usage:
+            return {'stream_options': {'include_usage': True}}
+        return {}
+
+    @staticmethod
+    def _finish_call(route, started, outcome, usage=None):
+        """Record one provider call's duration and token usage, and log it"""
+        seconds = time.perf_counter() - started
+        LLM_SECONDS.observe(seconds, route, outcome)
+        prompt_tokens = getattr(usage, 'prompt_tokens', None) or 0
+        completion_tokens = getattr(usage, 'completion_tokens', None) or 0
+        if usage is not None:
+            LLM_TOKENS.inc(prompt_tokens, route, 'prompt')
+            LLM_TOKENS.inc(completion_tokens, route, 'completion')
+        logger.log(logging.WARNING if outcome == 'error' else logging.INFO, 'llm call', extra={
+            'route': route,
+            'outcome': outcome,
+            'duration_ms': round(seconds * 1000, 1),
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens
+        })
+
+    @contextmanager
+    def _slot(self, route):
+        """Hold one per-route and one global in-flight slot"""
+        waiting = time.perf_counter()
+        route_slots = self._route_slots.get(route)
+        if route_slots is not None and not route_slots.acquire(timeout=self.queue_timeout):
+            self._count('rejected')
+            raise GatewayBusy(f"Too many concurrent '{route}' requests, please try again shortly")
+        if not self._global_slots.acquire(timeout=self.queue_timeout):
+            if route_slots is not None:
+                route_slots.release()
+            self._count('rejected')
+            raise GatewayBusy('Too many concurrent AI requests, please try again shortly')
+        LLM_QUEUE_SECONDS.observe(time.perf_counter() - waiting, route)
+
+        with self._lock:
+            self._in_flight[route] = self._in_flight.get(route, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight[route] -= 1
+            self._global_slots.release()
+            if route_slots is not None:
+                route_slots.release()
+
+    @asynccontextmanager
+    async def _async_slot(self, route):
+        """Async version of _slot(); takes the same slots, so threads and coroutines share one budget"""
+        waiting = time.perf_counter()
+        route_slots = self._route_slots.get(route)
+        if route_slots is not None and not await self._acquire_async(route_slots):
+            self._count('rejected')
+            raise GatewayBusy(f"Too many concurrent '{route}' requests, please try again shortly")
+        try:
+            acquired = await self._acquire_async(self._global_slots)
+        except BaseException:
+            if route_slots is not None:
+                route_slots.release()
+            raise
+        if not acquired:
+            if route_slots is not None:
+                route_slots.release()
+            self._count('rejected')
+            raise GatewayBusy('Too many concurrent AI requests, please try again shortly')
+        LLM_QUEUE_SECONDS.observe(time.perf_counter() - waiting, route)
+
+        with self._lock:
+            self._in_flight[route] = self._in_flight.get(route, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight[route] -= 1
+            self._global_slots.release()
+            if route_slots is not None:
+                route_slots.release()
+
+    async def _acquire_async(self, semaphore):
+        """Take a thread semaphore without blocking the event loop, or give up after queue_timeout
+
+        Polls instead of waiting in a worker thread, so a cancelled request can never
+        leave a slot taken behind it.
+        """
+        deadline = time.monotonic() + self.queue_timeout
+        delay = 0.005
+        while not semaphore.acquire(blocking=False):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.05)
+        return True
+
+    def _backoff_or_raise(self, error, attempt):
+        """Sleep with full jitter before the next attempt, or re-raise when out of retries"""
+        time.sleep(self._retry_delay(error, attempt))
+        return attempt + 1
+
+    def _retry_delay(self, error, attempt):
+        """Full-jitter delay before the next attempt; re-raises when out of retries"""
+        if attempt >= self.max_retries:
+            self._count('failures')
+            raise error
+
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        retry_after = self._retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+
+        self._count('retries')
+        logger.warning('llm retry', extra={'attempt': attempt + 1, 'delay_s': round(delay, 2), 'error': repr(error)})
+        return delay
+
+    @staticmethod
+    def _retry_after(error):
+        """Seconds the provider asked us to wait, if it said so"""
+        response = getattr(error, 'response', None)
+        if response is None:
+            return None
+        try:
+            return float(response.headers.get('retry-after'))
+        except (TypeError, ValueError):
+            return None
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
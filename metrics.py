@@ -0,0 +1,227 @@
+import bisect
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from fast JSON encoding up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _ThreadToken:
+    """Lives in a thread's locals; collected when the thread exits"""
+
+
+class _Sharded:
+    """Per-thread storage that is merged only when metrics are scraped
+
+    Each thread writes to its own dict, so recording takes no lock; the registry
+    lock is only taken the first time a thread records anything and when it exits,
+    at which point its shard is folded into a retired total and dropped.
+    """
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._shards_lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            # Thread-per-request servers would otherwise keep one shard per request ever served
+            self._local.token = _ThreadToken()
+            weakref.finalize(self._local.token, self._retire, shard)
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _retire(self, shard):
+        with self._shards_lock:
+            self._shards = [live for live in self._shards if live is not shard]
+            for labels, value in shard.items():
+                self._add(self._retired, labels, value)
+
+    def _snapshot(self):
+        with self._shards_lock:
+            shards = list(self._shards)
+            retired = dict(self._retired)
+        # Copies, so a writer adding a label set mid-scrape can't break iteration
+        return [retired] + [dict(shard) for shard in shards]
+
+    def _labels(self, values):
+        return ','.join(f'{name}="{escape(value)}"' for name, value in zip(self.label_names, values))
+
+
+class Counter(_Sharded):
+    kind = 'counter'
+
+    def inc(self, amount=1, *labels):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    @staticmethod
+    def _add(total, labels, value):
+        total[labels] = total.get(labels, 0) + value
+
+    def values(self):
+        merged = {}
+        for shard in self._snapshot():
+            for labels, value in shard.items():
+                merged[labels] = merged.get(labels, 0) + value
+        return merged
+
+    def render(self):
+        for labels, value in sorted(self.values().items()):
+            yield sample(self.name, self._labels(labels), value)
+
+
+class Gauge(Counter):
+    """Up/down counter; inc and dec may happen on different threads, the shards still sum up"""
+    kind = 'gauge'
+
+    def dec(self, amount=1, *labels):
+        self.inc(-amount, *labels)
+
+
+class Histogram(_Sharded):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        shard = self._shard()
+        entry = shard.get(labels)
+        if entry is None:
+            # One slot per bucket plus +Inf, then the running sum
+            entry = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        entry[bisect.bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    @staticmethod
+    def _add(total, labels, entry):
+        # A new list, so snapshots taken earlier never see it change
+        current = total.get(labels)
+        total[labels] = list(entry) if current is None else [a + b for a, b in zip(current, entry)]
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def render(self):
+        merged = {}
+        for shard in self._snapshot():
+            for labels, entry in shard.items():
+                total = merged.setdefault(labels, [0] * len(entry[:-1]) + [0.0])
+                for index, value in enumerate(entry):
+                    total[index] += value
+        for labels, entry in sorted(merged.items()):
+            label_text = self._labels(labels)
+            prefix = label_text + ',' if label_text else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), entry[:-1]):
+                cumulative += count
+                bound_text = '+Inf' if bound == float('inf') else repr(bound)
+                yield sample(f'{self.name}_bucket', f'{prefix}le="{bound_text}"', cumulative)
+            yield sample(f'{self.name}_sum', label_text, entry[-1])
+            yield sample(f'{self.name}_count', label_text, cumulative)
+
+
+class CallbackMetric:
+    """Gauge or counter whose values are read from fn() at scrape time
+
+    fn returns a number, or a dict of label-value tuples to numbers.
+    """
+
+    def __init__(self, name, help_text, fn, label_names=(), kind='gauge'):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+        self.label_names = tuple(label_names)
+        self.kind = kind
+
+    def render(self):
+        values = self.fn()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in sorted(values.items()):
+            label_text = ','.join(f'{name}="{escape(item)}"' for name, item in zip(self.label_names, labels))
+            yield sample(self.name, label_text, value)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self.register(Counter(name, help_text, label_names))
+
+    def gauge(self, name, help_text, label_names=()):
+        return self.register(Gauge(name, help_text, label_names))
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, label_names, buckets))
+
+    def callback(self, name, help_text, fn, label_names=(), kind='gauge'):
+        return self.register(CallbackMetric(name, help_text, fn, label_names, kind))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                lines.append(f'# error collecting {metric.name}: {escape(str(e))}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def sample(name, label_text, value):
+    return f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Process-wide registry and the metrics shared by the app and the LLM gateway
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram(
+    'http_request_duration_seconds', 'Time from request start until the response body is finished',
+    ('route', 'method', 'status')
+)
+REQUESTS_IN_FLIGHT = registry.gauge('http_requests_in_flight', 'Requests currently being handled', ('route',))
+PHASE_SECONDS = registry.histogram(
+    'phase_duration_seconds', 'Time spent in each phase of request handling (extraction, json)', ('phase',)
+)
+LLM_QUEUE_SECONDS = registry.histogram(
+    'llm_queue_wait_seconds', 'Time spent waiting for an LLM concurrency slot', ('route',)
+)
+LLM_SECONDS = registry.histogram(
+    'llm_request_duration_seconds', 'Time from sending an LLM request until its last token arrived',
+    ('route', 'outcome')
+)
+LLM_TOKENS = registry.counter('llm_tokens_total', 'Tokens reported in LLM response usage', ('route', 'kind'))
@@ -0,0 +1,90 @@
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """Runs speculative background work with a small, capped budget
+
+    Prefetches are skipped rather than queued when too many are pending or when
+    is_busy() reports that interactive requests need the capacity.
+    """
+
+    def __init__(self, max_workers=2, max_pending=8, is_busy=None):
+        self.max_pending = max_pending
+        self.is_busy = is_busy or (lambda: False)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prefetch')
+        self._pending = {}
+        self._cancelled = set()
+        self._lock = threading.Lock()
+        self.started = 0
+        self.skipped = 0
+        self.cancelled = 0
+        self.joined = 0
+
+    def submit(self, key, fn, *args):
+        """Start fn(*args) in the background under key; returns False if it was skipped"""
+        with self._lock:
+            if key in self._pending or len(self._pending) >= self.max_pending or self.is_busy():
+                self.skipped += 1
+                return False
+            self._cancelled.discard(key)
+            # Prefetch logs keep the request ID of the upload that triggered them
+            future = self._executor.submit(contextvars.copy_context().run, fn, *args)
+            self._pending[key] = future
+            self.started += 1
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return True
+
+    def cancel(self, key):
+        """Stop a prefetch; one that is already running has its result discarded"""
+        with self._lock:
+            future = self._pending.pop(key, None)
+            if future is None:
+                return False
+            future.cancel()
+            self._cancelled.add(key)
+            self.cancelled += 1
+            return True
+
+    def is_cancelled(self, key):
+        with self._lock:
+            return key in self._cancelled
+
+    def wait(self, key, timeout=None):
+        """Wait for a pending prefetch and return its result, or None if there is none"""
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                return None
+            self.joined += 1
+        # A failed or slow prefetch must never fail the request; the caller just generates it again
+        try:
+            return future.result(timeout=timeout)
+        except CancelledError:
+            return None
+        except Exception as e:
+            logger.warning('Prefetch for %s failed: %r', key, e)
+            return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': len(self._pending),
+                'max_pending': self.max_pending,
+                'started': self.started,
+                'skipped': self.skipped,
+                'cancelled': self.cancelled,
+                'joined': self.joined
+            }
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+            # Cancellation only matters while the key has a pending prefetch
+            if key not in self._pending:
+                self._cancelled.discard(key)
@@ -0,0 +1,149 @@
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame):
+    """Root-first 'a;b;c' stack of the frame, as used by flamegraph.pl and speedscope"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class Profile:
+    """Stack samples of one thread while it handles one request"""
+
+    def __init__(self, thread_id, info):
+        self.id = uuid.uuid4().hex[:12]
+        self.thread_id = thread_id
+        self.info = dict(info)
+        self.started = time.time()
+        self.duration_ms = None
+        self.samples = 0
+        self.stacks = {}
+
+    def add_sample(self, frame):
+        stack = collapse_stack(frame)
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+        self.samples += 1
+
+    def collapsed(self):
+        """Collapsed-stack text, one 'stack count' line per distinct stack"""
+        return ''.join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def summary(self):
+        top = max(self.stacks.items(), key=lambda item: item[1])[0].rsplit(';', 1)[-1] if self.stacks else None
+        return dict(self.info, id=self.id, started=self.started, duration_ms=self.duration_ms,
+                    samples=self.samples, top_frame=top)
+
+
+class SamplingProfiler:
+    """Samples the stacks of profiled threads from one background thread
+
+    Instead of tracing every call, a sampler wakes every interval seconds and
+    records where each profiled thread currently is, so the profiled request
+    runs at close to full speed. The sampler sleeps while nothing is profiled.
+    """
+
+    def __init__(self, interval=0.005, keep=50, slow_ms=1000, sample_rate=0.0, directory=None):
+        self.interval = interval
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self._recent = deque(maxlen=keep)
+        self._active = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.profiled = 0
+        self.kept = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def start(self, **info):
+        """Start sampling the calling thread; pass the returned profile to stop()"""
+        profile = Profile(threading.get_ident(), info)
+        with self._lock:
+            self._active[profile.id] = profile
+            self.profiled += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample_forever, name='profiler', daemon=True)
+                self._thread.start()
+            self._wake.set()
+        return profile
+
+    def stop(self, profile, keep=False, **info):
+        """Stop sampling; the profile is kept if keep is set or the request was slow"""
+        with self._lock:
+            self._active.pop(profile.id, None)
+            if not self._active:
+                self._wake.clear()
+        profile.duration_ms = round((time.time() - profile.started) * 1000, 1)
+        profile.info.update(info)
+        if not keep and profile.duration_ms < self.slow_ms:
+            return False
+
+        with self._lock:
+            self._recent.append(profile)
+            self.kept += 1
+        if self.directory:
+            self._write(profile)
+        return True
+
+    def recent(self):
+        """Summaries of kept profiles, newest first"""
+        with self._lock:
+            return [profile.summary() for profile in reversed(self._recent)]
+
+    def get(self, profile_id):
+        with self._lock:
+            for profile in self._recent:
+                if profile.id == profile_id:
+                    return profile
+        return None
+
+    def settings(self):
+        return {
+            'sample_rate': self.sample_rate,
+            'slow_ms': self.slow_ms,
+            'interval_ms': self.interval * 1000,
+            'keep': self._recent.maxlen,
+            'directory': self.directory,
+            'active': len(self._active),
+            'profiled': self.profiled,
+            'kept': self.kept
+        }
+
+    def _sample_forever(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            # Under the lock, so a profile never changes after stop() has handed it out
+            with self._lock:
+                for profile in self._active.values():
+                    frame = frames.get(profile.thread_id)
+                    if frame is not None:
+                        profile.add_sample(frame)
+            del frames
+
+    def _write(self, profile):
+        name = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(profile.started))}-{profile.id}.collapsed"
+        try:
+            with open(os.path.join(self.directory, name), 'w', encoding='utf-8') as f:
+                f.write(profile.collapsed())
+        except OSError as e:
+            logger.warning('Profile write error: %s', e)
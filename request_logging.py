@@ -0,0 +1,132 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+
+# Set per request and copied into worker threads, so every record logged while
+# handling the request (extraction, LLM calls, background sections) carries it
+request_id_var = contextvars.ContextVar('request_id', default=None)
+# False for requests left out by sampling: only their warnings and errors are kept
+sampled_var = contextvars.ContextVar('log_sampled', default=True)
+
+# Attributes every LogRecord has; anything else was passed in extra= and is logged as a field
+STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+REQUEST_ID_MAX_LENGTH = 128
+
+_listener = None
+
+
+def parse_sample_rates(spec):
+    """Parse "/chat=0.1,/healthz=0" into {'/chat': 0.1, '/healthz': 0.0}"""
+    rates = {}
+    for item in (spec or '').split(','):
+        if '=' in item:
+            route, rate = item.split('=', 1)
+            rates[route.strip()] = float(rate)
+    return rates
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request_id and any extra fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+        }
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """Tag records with the current request ID and drop sampled-out chatter
+
+    Runs on the thread that logged the record, before it is queued, so it sees
+    that thread's context variables.
+    """
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return record.levelno >= logging.WARNING or sampled_var.get()
+
+
+class NonBlockingHandler(QueueHandler):
+    """Hands records to a background listener; drops them rather than wait if the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Resolve the message and traceback now; the listener thread can't see our arguments safely
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level='INFO', queue_size=10000, stream=None):
+    """Route all logging through a bounded queue to one JSON stream handler; safe to call twice"""
+    global _listener
+    root = logging.getLogger()
+    if _listener is not None:
+        return next(h for h in root.handlers if isinstance(h, NonBlockingHandler))
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JSONFormatter())
+    handler = NonBlockingHandler(queue.Queue(maxsize=queue_size))
+    handler.addFilter(RequestContextFilter())
+
+    root.handlers = [handler]
+    root.setLevel(level)
+    # Per-request HTTP client chatter would drown out our own records
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+    _listener = QueueListener(handler.queue, output)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return handler
+
+
+def start_request(route, incoming_id=None, sample_rates=None):
+    """Adopt the caller's request ID (or make one) and decide whether to sample this request"""
+    request_id = (incoming_id or '').strip()[:REQUEST_ID_MAX_LENGTH] or uuid.uuid4().hex
+    request_id_var.set(request_id)
+    rate = (sample_rates or {}).get(route, 1.0)
+    sampled_var.set(rate >= 1.0 or random.random() < rate)
+    return request_id
+
+
+def end_request():
+    request_id_var.set(None)
+    sampled_var.set(True)
+
+
+def submit_with_context(executor, fn, *args, **kwargs):
+    """executor.submit() that runs fn in a copy of the caller's context, request ID included"""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
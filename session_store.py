@@ -0,0 +1,151 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(value):
+    """Rough number of bytes held by a session value (strings dominate)"""
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(key) + estimate_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(item) for item in value)
+    return 8
+
+
+class SessionStore:
+    """In-memory session store with idle-TTL and LRU eviction under a byte budget"""
+
+    def __init__(self, idle_ttl=3600, max_bytes=256 * 1024 * 1024, sweep_interval=60):
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        # session_id -> [last_access, size, data], least recently used first
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.expired = 0
+        self.evicted = 0
+
+        if sweep_interval:
+            sweeper = threading.Thread(
+                target=self._sweep_forever,
+                args=(sweep_interval,),
+                name='session-sweeper',
+                daemon=True
+            )
+            sweeper.start()
+
+    def get(self, session_id):
+        """Return the session dict and mark it as recently used, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            if now - entry[0] > self.idle_ttl:
+                self._remove(session_id)
+                self.expired += 1
+                return None
+            entry[0] = now
+            self._sessions.move_to_end(session_id)
+            return entry[2]
+
+    def set(self, session_id, data):
+        """Store a whole session, evicting idle or least recently used ones if needed"""
+        size = estimate_size(data)
+        with self._lock:
+            if session_id in self._sessions:
+                self._remove(session_id)
+            self._sessions[session_id] = [time.time(), size, data]
+            self.bytes += size
+            self._enforce_budget()
+
+    def update(self, session_id, **fields):
+        """Replace fields of an existing session; returns False if it is gone"""
+        return self.modify(session_id, lambda data: fields)
+
+    def modify(self, session_id, change):
+        """Atomically apply change(data) -> dict of fields to replace; returns False if gone
+
+        change runs under the store lock, so it must be quick and must not block.
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return False
+            entry[2].update(change(entry[2]))
+            size = estimate_size(entry[2])
+            self.bytes += size - entry[1]
+            entry[1] = size
+            entry[0] = time.time()
+            self._sessions.move_to_end(session_id)
+            self._enforce_budget()
+            return True
+
+    def delete(self, session_id):
+        with self._lock:
+            if session_id in self._sessions:
+                self._remove(session_id)
+
+    def __contains__(self, session_id):
+        return self.get(session_id) is not None
+
+    def __getitem__(self, session_id):
+        data = self.get(session_id)
+        if data is None:
+            raise KeyError(session_id)
+        return data
+
+    def __setitem__(self, session_id, data):
+        self.set(session_id, data)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def sweep(self):
+        """Drop every session idle for longer than idle_ttl"""
+        cutoff = time.time() - self.idle_ttl
+        with self._lock:
+            # Least recently used sessions come first, so stop at the first live one
+            while self._sessions:
+                session_id, entry = next(iter(self._sessions.items()))
+                if entry[0] >= cutoff:
+                    break
+                self._remove(session_id)
+                self.expired += 1
+
+    def stats(self):
+        """Live sessions, bytes held and eviction counters"""
+        with self._lock:
+            return {
+                'live_sessions': len(self._sessions),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'idle_ttl': self.idle_ttl,
+                'expired': self.expired,
+                'evicted': self.evicted
+            }
+
+    def _remove(self, session_id):
+        entry = self._sessions.pop(session_id)
+        self.bytes -= entry[1]
+
+    def _enforce_budget(self):
+        """Evict least recently used sessions until under max_bytes (caller holds the lock)"""
+        # Never evict the session that was just written, even if it alone is over budget
+        while self.bytes > self.max_bytes and len(self._sessions) > 1:
+            session_id = next(iter(self._sessions))
+            self._remove(session_id)
+            self.evicted += 1
+
+    def _sweep_forever(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.exception("Session sweeper error: %s", e)
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one
+
+    The first caller for a key runs the function; callers arriving while it is
+    still running wait for it and get the same result (or exception). Nothing is
+    kept once the call finishes, so later calls run again.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.calls += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key)
+            future.set_exception(e)
+            raise
+        self._finish(key)
+        future.set_result(result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {'in_flight': len(self._calls), 'calls': self.calls, 'shared': self.shared}
+
+    def _finish(self, key):
+        with self._lock:
+            del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines on one event loop"""
+
+    def __init__(self):
+        self._calls = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key, fn, *args, **kwargs):
+        task = self._calls.get(key)
+        if task is not None:
+            self.shared += 1
+        else:
+            task = self._calls[key] = asyncio.ensure_future(fn(*args, **kwargs))
+            task.add_done_callback(lambda done: self._calls.pop(key, None))
+            self.calls += 1
+        # Shielded, so one caller disconnecting doesn't cancel the call for the others
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {'in_flight': len(self._calls), 'calls': self.calls, 'shared': self.shared}